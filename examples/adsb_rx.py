@@ -181,7 +181,7 @@ class adsb_rx(gr.top_block, Qt.QWidget):
         self.analog_const_source_x_0 = analog.sig_source_f(0, analog.GR_CONST_WAVE, 0, 0, threshold)
         self.adsb_framer_1 = adsb.framer(fs, threshold)
         self.adsb_demod_0 = adsb.demod(fs)
-        self.adsb_decoder_0 = adsb.decoder("Extended Squitter Only", "None", "Brief")
+        self.adsb_decoder_0 = adsb.decoder("Extended Squitter Only", "None", "Brief", pub_address="tcp://127.0.0.1:5002", pub_format="JSON")
 
 
         ##################################################
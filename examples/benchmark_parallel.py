@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Benchmark of the sharded decoder. Replays a capture of frames, one hex frame
+per line like dump1090's raw output (with or without the surrounding *...;),
+or a synthetic capture of extended squitters from many aircraft, through the
+single process decoder and the sharded decoder with 1 to N worker processes.
+
+    $ python3 benchmark_parallel.py --workers 4
+    $ python3 benchmark_parallel.py --capture frames.txt --workers 8
+"""
+
+import argparse
+import multiprocessing
+import time
+
+from gnuradio.adsb.modes import crc24, decode_frame
+from gnuradio.adsb.parallel import ShardedDecoder
+from gnuradio.adsb.tracker import AircraftTracker
+
+# Example frames from http://adsb-decode-guide.readthedocs.org
+TEMPLATE_FRAMES = [
+    bytes.fromhex("8D4840D6202CC371C32CE0576098"),
+    bytes.fromhex("8D40621D58C382D690C8AC2863A7"),
+    bytes.fromhex("8D40621D58C386435CC412692AD6"),
+    bytes.fromhex("8D485020994409940838175B284F"),
+]
+
+
+def synthetic_capture(num_frames, num_aircraft):
+    # The template frames re-addressed to many aircraft, one frame every
+    # 100 us
+    frames = []
+    for ii in range(num_frames):
+        template = TEMPLATE_FRAMES[ii % len(TEMPLATE_FRAMES)]
+        icao = 0x400000 + (ii*7919) % num_aircraft
+        data = template[0:1] + icao.to_bytes(3, "big") + template[4:11]
+        frames.append((data + crc24(data).to_bytes(3, "big"), 1000.0 + ii*1e-4))
+    return frames
+
+
+def read_capture(filename):
+    frames = []
+    with open(filename) as f:
+        for (ii, line) in enumerate(f):
+            line = line.strip().strip("*;")
+            if len(line) in (14, 28):
+                frames.append((bytes.fromhex(line), 1000.0 + ii*1e-4))
+    return frames
+
+
+def run_single(frames):
+    tracker = AircraftTracker()
+    start = time.perf_counter()
+    for (frame, timestamp) in frames:
+        msg = decode_frame(frame, timestamp, tracker.known_addresses(timestamp))
+        if msg.crc_passed:
+            tracker.update(msg)
+    return time.perf_counter() - start
+
+
+def run_sharded(frames, num_workers):
+    num_called = [0]
+    def callback(msg, plane, context):
+        num_called[0] += 1
+
+    decoder = ShardedDecoder(num_workers, callback)
+    start = time.perf_counter()
+    for (frame, timestamp) in frames:
+        decoder.submit(frame, timestamp)
+    # Returns once every frame is decoded and called back
+    decoder.close()
+    elapsed = time.perf_counter() - start
+    if num_called[0] != len(frames):
+        raise RuntimeError("{} workers decoded {} of {} frames, {} lost".format(num_workers, num_called[0], len(frames), decoder.num_lost))
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the sharded ADS-B decoder")
+    parser.add_argument("--capture", help="File of hex frames to replay, a synthetic capture if not given")
+    parser.add_argument("--frames", type=int, default=200000, help="Number of synthetic frames")
+    parser.add_argument("--aircraft", type=int, default=1000, help="Number of synthetic aircraft")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(), help="Max number of worker processes")
+    args = parser.parse_args()
+
+    frames = read_capture(args.capture) if args.capture else synthetic_capture(args.frames, args.aircraft)
+    print("{} frames, {} CPUs".format(len(frames), multiprocessing.cpu_count()))
+
+    single = run_single(frames)
+    print("Single process:  {:9.0f} frames/s".format(len(frames)/single))
+    for num_workers in range(1, args.workers + 1):
+        elapsed = run_sharded(frames, num_workers)
+        print("{} workers:       {:9.0f} frames/s  {:4.2f}x".format(num_workers, len(frames)/elapsed, single/elapsed))
+
+
+if __name__ == "__main__":
+    main()
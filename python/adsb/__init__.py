@@ -24,3 +24,6 @@ except ModuleNotFoundError:
 from .framer import framer
 from .demod import demod
 from .decoder import decoder
+from .prefilter import prefilter
+from .modes import DecodedMessage, decode_frame
+from .tracker import AircraftTracker
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Known aircraft addresses, used to validate Address/Parity frames.
+"""
+
+ADDRESS_TTL_S = 60 # Seconds an address stays known after its last clean DF 11/17
+ADDRESS_SPACE = 1 << 24
+
+
+class AddressTable(object):
+    """
+    ICAO addresses (ints) heard recently in a frame with a clean CRC, mapped
+    to when they were last heard. The recovered address of an Address/Parity
+    frame is only accepted if it's in the table and was heard within `ttl`
+    seconds of the current time, which is advanced with set_time() and add().
+
+    Address/Parity frames with bit errors recover a random address, so each
+    rejected lookup had a len(table)/2^24 chance of being falsely accepted.
+    That chance is summed in `expected_false_accepts`.
+    """
+    def __init__(self, ttl=ADDRESS_TTL_S):
+        self.ttl = ttl
+        self.last_seen = dict()
+        self.now = float("-inf")
+        self.next_sweep = float("-inf")
+
+        self.num_lookups = 0
+        self.num_accepts = 0
+        self.num_expired = 0
+        self.expected_false_accepts = 0.0
+
+
+    def __len__(self):
+        return len(self.last_seen)
+
+
+    def __contains__(self, icao):
+        self.num_lookups += 1
+        last_seen = self.last_seen.get(icao)
+        if last_seen is not None and self.now - last_seen <= self.ttl:
+            self.num_accepts += 1
+            return True
+
+        self.expected_false_accepts += len(self.last_seen)/ADDRESS_SPACE
+        return False
+
+
+    def __iter__(self):
+        # The addresses still within the TTL, without counting lookups
+        expiry = self.now - self.ttl
+        return (icao for (icao, last_seen) in self.last_seen.items() if last_seen >= expiry)
+
+
+    def add(self, icao, now):
+        self.last_seen[icao] = now
+        self.set_time(now)
+
+
+    def set_time(self, now):
+        if now > self.now:
+            self.now = now
+        if self.now >= self.next_sweep:
+            self.sweep()
+
+
+    def sweep(self):
+        # Drop expired addresses, at most a few times per TTL so the table
+        # only holds aircraft in range
+        expiry = self.now - self.ttl
+        expired = [icao for (icao, last_seen) in self.last_seen.items() if last_seen < expiry]
+        for icao in expired:
+            del self.last_seen[icao]
+        self.num_expired += len(expired)
+        self.next_sweep = self.now + self.ttl/4
+
+
+    def stats(self):
+        return {
+            "addresses": len(self.last_seen),
+            "lookups": self.num_lookups,
+            "accepts": self.num_accepts,
+            "expired": self.num_expired,
+            "expected_false_accepts": self.expected_false_accepts,
+        }
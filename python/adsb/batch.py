@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Vectorized decoding of many frames at once, for reprocessing recordings.
+Frames are rows of an (N x 14) uint8 matrix and the results are columns,
+one array per field, computed with NumPy array operations instead of a
+Python loop per frame.
+"""
+
+import numpy as np
+
+from .modes import (
+    ALTITUDE_AC12_LUT, ALTITUDE_AC13_LUT, CPR_DLAT_EVEN, CPR_DLAT_ODD, CRC_TABLE, PARITY_LUT, PARITY_PI,
+    cpr_nl_array, decode_callsigns,
+)
+from .tracker import CPR_TIMEOUT_S
+
+CRC_TABLE_ARRAY = np.array(CRC_TABLE, dtype=np.uint32)
+ALTITUDE_AC12_ARRAY = np.array(ALTITUDE_AC12_LUT, dtype=np.float64)
+ALTITUDE_AC13_ARRAY = np.array(ALTITUDE_AC13_LUT, dtype=np.float64)
+
+# Parity type (-1 unsupported) and number of bytes, indexed by DF
+PARITY_TYPE_ARRAY = np.array([p[0] if p is not None else -1 for p in PARITY_LUT], dtype=np.int8)
+NUM_BYTES_ARRAY = np.array([p[1]//8 if p is not None else 0 for p in PARITY_LUT], dtype=np.uint8)
+
+
+def frames_from_bits(bits):
+    """
+    Pack an (N x 112) matrix of demodulated bits, as published on the demod
+    block's "demodulated" port, into an (N x 14) frame matrix.
+    """
+    return np.packbits(np.asarray(bits, dtype=np.uint8), axis=1)
+
+
+def field(value, start, length):
+    """
+    Extract `length` bits starting at bit `start` (0 is the MSB) from an
+    array of 56-bit values.
+    """
+    return (value >> np.uint64(56 - start - length)) & np.uint64((1 << length) - 1)
+
+
+def syndromes(frames):
+    """
+    CRC of the data bits XORed with the parity bits of every frame, for both
+    56 and 112-bit frames, computed one byte column at a time.
+    """
+    crc = np.zeros(frames.shape[0], dtype=np.uint32)
+    for col in range(11):
+        if col == 4:
+            crc_56 = crc
+        crc = ((crc << np.uint32(8)) & np.uint32(0xFFFFFF)) ^ CRC_TABLE_ARRAY[(crc >> np.uint32(16)) ^ frames[:, col]]
+
+    parity_56 = (frames[:, 4].astype(np.uint32) << 16) | (frames[:, 5].astype(np.uint32) << 8) | frames[:, 6]
+    parity_112 = (frames[:, 11].astype(np.uint32) << 16) | (frames[:, 12].astype(np.uint32) << 8) | frames[:, 13]
+    return (crc_56 ^ parity_56, crc ^ parity_112)
+
+
+def cpr_global_array(lat_cpr_even, lon_cpr_even, lat_cpr_odd, lon_cpr_odd, most_recent):
+    """
+    Vectorized modes.cpr_global() for arrays of even/odd CPR pairs. Pairs in
+    different latitude zones decode to NaN.
+    """
+    lat_cpr_even = lat_cpr_even/131072.0
+    lon_cpr_even = lon_cpr_even/131072.0
+    lat_cpr_odd = lat_cpr_odd/131072.0
+    lon_cpr_odd = lon_cpr_odd/131072.0
+
+    # Calculate the latitude index
+    j = np.floor(59*lat_cpr_even - 60*lat_cpr_odd + 0.5)
+
+    lat_even = CPR_DLAT_EVEN*(np.mod(j, 60) + lat_cpr_even)
+    lat_even[lat_even >= 270] -= 360
+
+    lat_odd = CPR_DLAT_ODD*(np.mod(j, 59) + lat_cpr_odd)
+    lat_odd[lat_odd >= 270] -= 360
+
+    nl = cpr_nl_array(lat_even)
+
+    # Calculate the longitude index. Both latitudes share the same NL.
+    m = np.floor(lon_cpr_even*(nl-1) - lon_cpr_odd*nl + 0.5)
+
+    # Use the most recent frame
+    lat = np.where(most_recent == 0, lat_even, lat_odd)
+    ni = np.maximum(nl - most_recent, 1)
+    lon_cpr = np.where(most_recent == 0, lon_cpr_even, lon_cpr_odd)
+    lon = (360.0/ni)*(np.mod(m, ni) + lon_cpr)
+    lon[lon >= 180.0] -= 360.0
+
+    # Even/odd latitudes not in the same latitude zone
+    invalid = nl != cpr_nl_array(lat_odd)
+    lat[invalid] = np.nan
+    lon[invalid] = np.nan
+
+    return (lat, lon)
+
+
+def pair_cpr(icao, timestamps, cpr_format, lat_cpr, lon_cpr, position):
+    """
+    Global CPR positions for the `position` rows. Each airborne position
+    frame is paired with the most recent earlier frame of the other format
+    from the same aircraft, if it's within CPR_TIMEOUT_S, like the tracker
+    does frame by frame.
+    """
+    latitude = np.full(icao.shape[0], np.nan)
+    longitude = np.full(icao.shape[0], np.nan)
+
+    rows = np.flatnonzero(position)
+    if rows.size == 0:
+        return (latitude, longitude)
+
+    # Group the position frames by aircraft, in time order
+    rows = rows[np.lexsort((timestamps[rows], icao[rows]))]
+    group = icao[rows]
+    fmt = cpr_format[rows].astype(np.int64)
+    index = np.arange(rows.size)
+    group_start = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    group_start = np.repeat(group_start, np.diff(np.r_[group_start, rows.size]))
+
+    # Index of the latest frame of each format up to and including each row
+    latest = []
+    for f in (0, 1):
+        latest.append(np.maximum.accumulate(np.where(fmt == f, index, -1)))
+    other = np.where(fmt == 0, latest[1], latest[0])
+
+    paired = (other >= group_start)
+    paired[paired] &= (timestamps[rows[paired]] - timestamps[rows[other[paired]]]) < CPR_TIMEOUT_S
+    if not paired.any():
+        return (latitude, longitude)
+
+    this_rows = rows[paired]
+    other_rows = rows[other[paired]]
+    most_recent = fmt[paired]
+    even_rows = np.where(most_recent == 0, this_rows, other_rows)
+    odd_rows = np.where(most_recent == 0, other_rows, this_rows)
+
+    (lat, lon) = cpr_global_array(
+        lat_cpr[even_rows].astype(np.float64), lon_cpr[even_rows].astype(np.float64),
+        lat_cpr[odd_rows].astype(np.float64), lon_cpr[odd_rows].astype(np.float64),
+        most_recent,
+    )
+    latitude[this_rows] = lat
+    longitude[this_rows] = lon
+    return (latitude, longitude)
+
+
+def decode_batch(frames, timestamps, known_addresses=()):
+    """
+    Decode a batch of Mode S frames.
+
+    Arguments:
+        frames: (N x 14) uint8 matrix, one frame per row. 56-bit frames use
+            the first 7 bytes.
+        timestamps: Length N array of reception times, in seconds.
+        known_addresses: ICAO addresses (ints) Address/Parity frames are
+            validated against, in addition to the addresses of the DF 11
+            and 17 frames in the batch that passed the CRC. An AddressTable,
+            e.g. AircraftTracker.known_addresses(), contributes the
+            addresses still within its TTL.
+
+    Returns:
+        A dict of length N arrays: "timestamp", "df", "crc_passed", "icao",
+        "ca", "tc", "altitude", "callsign", "speed", "heading",
+        "vertical_rate", "cpr_format", "lat_cpr", "lon_cpr", "latitude" and
+        "longitude". Integer fields are -1, float fields NaN and callsigns
+        empty where they don't apply or the CRC failed. Error correction is
+        not done.
+    """
+    frames = np.ascontiguousarray(frames, dtype=np.uint8)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    n = frames.shape[0]
+
+    df = frames[:, 0] >> 3
+    ca = (frames[:, 0] & 0x7).astype(np.int8)
+    header = (frames[:, 0].astype(np.uint32) << 24) | (frames[:, 1].astype(np.uint32) << 16) | (frames[:, 2].astype(np.uint32) << 8) | frames[:, 3]
+    aa = (header & 0xFFFFFF).astype(np.int64)
+
+    # Message, 56 bits, after the 32-bit header of 112-bit frames
+    me = np.zeros(n, dtype=np.uint64)
+    for col in range(4, 11):
+        me = (me << np.uint64(8)) | frames[:, col].astype(np.uint64)
+
+    # CRC, the AP of Address/Parity frames is the ICAO address
+    parity_type = PARITY_TYPE_ARRAY[df]
+    (syndrome_56, syndrome_112) = syndromes(frames)
+    residual = np.where(NUM_BYTES_ARRAY[df] == 7, syndrome_56, syndrome_112).astype(np.int64)
+
+    pi = parity_type == PARITY_PI
+    ap = parity_type == 1 - PARITY_PI
+    crc_passed = pi & (residual == 0)
+
+    known = np.unique(np.r_[np.fromiter(known_addresses, dtype=np.int64), aa[crc_passed & ((df == 11) | (df == 17))]])
+    crc_passed |= ap & np.isin(residual, known)
+
+    icao = np.where(pi, aa, np.where(ap, residual, -1))
+    icao[~crc_passed] = -1
+
+    # Extended squitters carrying ADS-B messages
+    cf_af = frames[:, 0] & 0x7
+    es = crc_passed & ((df == 17) | ((df == 18) & np.isin(cf_af, (0, 1, 6))) | ((df == 19) & (cf_af == 0)))
+    tc = np.where(es, field(me, 0, 5), 0).astype(np.int8)
+    tc[~es] = -1
+    ca[~(crc_passed & ((df == 11) | (df == 17)))] = -1
+
+    # Altitude, the 13-bit code of DF 0, 4, 16, 20 and the 12-bit code of
+    # airborne position messages
+    altitude = np.full(n, np.nan)
+    ac13 = crc_passed & np.isin(df, (0, 4, 16, 20))
+    altitude[ac13] = ALTITUDE_AC13_ARRAY[header[ac13] & 0x1FFF]
+    position = es & (tc >= 9) & (tc <= 18)
+    altitude[position] = ALTITUDE_AC12_ARRAY[field(me[position], 8, 12).astype(np.int64)]
+    altitude[altitude == -1] = np.nan
+
+    # Callsign, 48 bits
+    callsign = np.full(n, "", dtype="<U8")
+    identification = es & (tc >= 1) & (tc <= 4)
+    callsign[identification] = decode_callsigns(field(me[identification], 8, 48))
+
+    # Ground velocity
+    speed = np.full(n, np.nan)
+    heading = np.full(n, np.nan)
+    vertical_rate = np.full(n, np.nan)
+    st = field(me, 5, 3)
+    velocity = es & (tc == 19) & ((st == 1) | (st == 2))
+    v = me[velocity]
+    velocity_we = field(v, 14, 10).astype(np.float64) - 1
+    velocity_we[field(v, 13, 1) == 1] *= -1
+    velocity_sn = field(v, 25, 10).astype(np.float64) - 1
+    velocity_sn[field(v, 24, 1) == 1] *= -1
+    speed[velocity] = np.hypot(velocity_sn, velocity_we)
+    heading[velocity] = np.degrees(np.arctan2(velocity_sn, velocity_we))
+    rate = (field(v, 37, 9).astype(np.float64) - 1)*64
+    rate[field(v, 36, 1) == 1] *= -1
+    vertical_rate[velocity] = rate
+
+    # Position
+    cpr_format = np.where(position, field(me, 21, 1), 0).astype(np.int8)
+    lat_cpr = np.where(position, field(me, 22, 17), 0).astype(np.int32)
+    lon_cpr = np.where(position, field(me, 39, 17), 0).astype(np.int32)
+    (latitude, longitude) = pair_cpr(icao, timestamps, cpr_format, lat_cpr, lon_cpr, position)
+    cpr_format[~position] = -1
+    lat_cpr[~position] = -1
+    lon_cpr[~position] = -1
+
+    return {
+        "timestamp": timestamps,
+        "df": df,
+        "crc_passed": crc_passed,
+        "icao": icao,
+        "ca": ca,
+        "tc": tc,
+        "altitude": altitude,
+        "callsign": callsign,
+        "speed": speed,
+        "heading": heading,
+        "vertical_rate": vertical_rate,
+        "cpr_format": cpr_format,
+        "lat_cpr": lat_cpr,
+        "lon_cpr": lon_cpr,
+        "latitude": latitude,
+        "longitude": longitude,
+    }
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Coalesced publishing. Updates are held per key and only the latest one for
+each key is published when the timer fires, so a busy aircraft costs one
+publish per interval however many messages it sends.
+"""
+
+import threading
+
+
+class PublishCoalescer(object):
+    """
+    Calls `publish(value)` from a timer thread every `interval` seconds with
+    the latest value given to update() for each key since the last flush.
+    """
+    def __init__(self, publish, interval):
+        self.publish = publish
+        self.interval = interval
+
+        # Latest value per key, in first-update order
+        self.lock = threading.Lock()
+        self.pending = dict()
+
+        self.num_updates = 0
+        self.num_published = 0
+
+        self.stopped = threading.Event()
+        self.timer = threading.Thread(target=self.run)
+        self.timer.daemon = True
+        self.timer.start()
+
+
+    def update(self, key, value):
+        with self.lock:
+            self.pending[key] = value
+            self.num_updates += 1
+
+
+    def flush(self):
+        with self.lock:
+            (pending, self.pending) = (self.pending, dict())
+            self.num_published += len(pending)
+
+        for value in pending.values():
+            self.publish(value)
+
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+
+    def stats(self):
+        with self.lock:
+            return {
+                "updates": self.num_updates,
+                "published": self.num_published,
+                "pending": len(self.pending),
+            }
+
+
+    def close(self):
+        # Stop the timer and publish what's left
+        self.stopped.set()
+        self.timer.join()
+        self.flush()
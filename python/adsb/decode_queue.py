@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Bounded decode queue. Frames are handed off by the message handler and
+decoded by a worker thread, so a slow decode shows up as queue depth and
+drops instead of an unbounded GNU Radio message queue.
+"""
+
+import collections
+import heapq
+import logging
+import threading
+import time
+
+OVERFLOW_POLICIES = ["Drop Oldest", "Drop Lowest SNR", "Block"]
+
+logger = logging.getLogger(__name__)
+
+
+class DecodeQueue(object):
+    """
+    Calls `callback(item)` from a worker thread for every item put on the
+    queue, in arrival order. When `max_depth` items are waiting, put() applies
+    the overflow policy:
+
+        "Drop Oldest"       discard the item that has waited longest
+        "Drop Lowest SNR"   discard the waiting (or new) item with the lowest SNR
+        "Block"             wait for the worker to make room
+    """
+    def __init__(self, callback, max_depth, policy="Drop Oldest"):
+        if max_depth < 1:
+            raise ValueError("max_depth must be at least 1")
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy {}".format(policy))
+
+        self.callback = callback
+        self.max_depth = max_depth
+        self.policy = policy
+
+        # Waiting items as (seq, snr, item), plus a heap of (snr, seq) for the
+        # "Drop Lowest SNR" policy. Items dropped from the middle of the queue
+        # are removed lazily, by sequence number.
+        self.items = collections.deque()
+        self.snr_heap = []
+        self.dropped_seqs = set()
+        self.depth = 0
+        self.next_seq = 0
+
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+        # Metrics
+        self.num_put = 0
+        self.num_processed = 0
+        self.num_dropped = 0
+        self.num_errors = 0
+        self.max_depth_seen = 0
+        self.block_time = 0.0
+        self.service_time = 0.0
+        self.max_service_time = 0.0
+
+        self.running = True
+        self.worker = threading.Thread(target=self.work)
+        self.worker.daemon = True
+        self.worker.start()
+
+
+    def put(self, item, snr=0.0):
+        with self.lock:
+            if not self.running:
+                return False
+
+            self.num_put += 1
+
+            if self.depth >= self.max_depth:
+                if self.policy == "Block":
+                    start = time.perf_counter()
+                    while self.running and self.depth >= self.max_depth:
+                        self.not_full.wait()
+                    self.block_time += time.perf_counter() - start
+                    if not self.running:
+                        return False
+                elif self.policy == "Drop Oldest":
+                    self.pop_item()
+                    self.num_dropped += 1
+                else:
+                    self.num_dropped += 1
+                    if not self.drop_lowest_snr(snr):
+                        # The new item is the weakest
+                        return False
+
+            seq = self.next_seq
+            self.next_seq += 1
+            self.items.append((seq, snr, item))
+            if self.policy == "Drop Lowest SNR":
+                heapq.heappush(self.snr_heap, (snr, seq))
+            self.depth += 1
+            self.max_depth_seen = max(self.max_depth_seen, self.depth)
+
+            self.not_empty.notify()
+            return True
+
+
+    def pop_item(self):
+        # Called with the lock held and depth > 0
+        while True:
+            (seq, snr, item) = self.items.popleft()
+            if seq in self.dropped_seqs:
+                self.dropped_seqs.discard(seq)
+                continue
+            self.depth -= 1
+
+            if len(self.snr_heap) > 2*self.max_depth:
+                # Prune entries for items that have already been serviced
+                self.snr_heap = [(snr, seq) for (seq, snr, _) in self.items if seq not in self.dropped_seqs]
+                heapq.heapify(self.snr_heap)
+
+            return item
+
+
+    def drop_lowest_snr(self, snr):
+        # Called with the lock held and the queue full. Returns False if the
+        # new item has the lowest SNR and should be dropped instead.
+        while True:
+            (lowest_snr, seq) = self.snr_heap[0]
+            if seq < self.items[0][0] or seq in self.dropped_seqs:
+                # Already serviced or dropped
+                heapq.heappop(self.snr_heap)
+                continue
+            break
+
+        if snr <= lowest_snr:
+            return False
+
+        heapq.heappop(self.snr_heap)
+        self.dropped_seqs.add(seq)
+        self.depth -= 1
+        return True
+
+
+    def work(self):
+        while True:
+            with self.lock:
+                while self.running and self.depth == 0:
+                    self.not_empty.wait()
+                if self.depth == 0:
+                    # Stopped and drained
+                    break
+                item = self.pop_item()
+                self.not_full.notify()
+
+            start = time.perf_counter()
+            try:
+                self.callback(item)
+                failed = False
+            except Exception:
+                # Keep servicing the queue, one bad frame mustn't stop decoding
+                logger.exception("Decode queue callback failed")
+                failed = True
+            elapsed = time.perf_counter() - start
+
+            with self.lock:
+                self.num_processed += 1
+                self.num_errors += failed
+                self.service_time += elapsed
+                self.max_service_time = max(self.max_service_time, elapsed)
+
+
+    def stats(self):
+        with self.lock:
+            return {
+                "depth": self.depth,
+                "max_depth": self.max_depth_seen,
+                "put": self.num_put,
+                "processed": self.num_processed,
+                "dropped": self.num_dropped,
+                "errors": self.num_errors,
+                "block_time": self.block_time,
+                "mean_service_time": self.service_time/self.num_processed if self.num_processed else 0.0,
+                "max_service_time": self.max_service_time,
+            }
+
+
+    def close(self):
+        # Stop accepting items and wait for the waiting ones to be decoded
+        with self.lock:
+            self.running = False
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+        self.worker.join()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Duplicate frame suppression. Identical frames received within a short window,
+from several receivers or from retriggered overlapping bursts, are detected
+before decoding so they don't update and republish aircraft state.
+"""
+
+import collections
+
+DEDUP_MAX_ENTRIES = 65536 # Max frames remembered, regardless of the window
+
+
+class FrameDeduplicator(object):
+    """
+    Remembers frames seen in the last `window` seconds. Frames are looked up
+    in a hash table and expire in arrival order from a ring of
+    (timestamp, frame), so each lookup does amortized constant work.
+    """
+    def __init__(self, window, max_entries=DEDUP_MAX_ENTRIES):
+        self.window = window
+        self.max_entries = max_entries
+
+        # Frame bytes -> first time seen within the window. Each frame in
+        # `seen` is in the ring exactly once.
+        self.seen = dict()
+        self.ring = collections.deque()
+
+        self.num_lookups = 0
+        self.num_hits = 0
+
+
+    def is_duplicate(self, frame, timestamp):
+        self.num_lookups += 1
+
+        # Expire frames older than the window
+        expiry = timestamp - self.window
+        ring = self.ring
+        seen = self.seen
+        while ring and (ring[0][0] < expiry or len(ring) >= self.max_entries):
+            del seen[ring.popleft()[1]]
+
+        if frame in seen:
+            self.num_hits += 1
+            return True
+
+        seen[frame] = timestamp
+        ring.append((timestamp, frame))
+        return False
+
+
+    def stats(self):
+        return {
+            "entries": len(self.seen),
+            "lookups": self.num_lookups,
+            "hits": self.num_hits,
+            "hit_rate": self.num_hits/self.num_lookups if self.num_lookups else 0.0,
+        }
@@ -0,0 +1,973 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Stateless Mode S and ADS-B frame decoding. Nothing in this module depends on
+GNU Radio, so it can be used to decode, test or benchmark frames outside of a
+flowgraph. Aircraft state is kept by adsb.tracker.
+"""
+
+import bisect
+import math
+import sys
+
+import numpy as np
+
+
+# Downlink Format, 5 bits
+DF_STR_LUT = (
+    "Short Air-Air Surveillance (ACAS)",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Surveillance Altitude Reply",
+    "Surveillance Identity Reply",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "All-Call Reply",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Long Air-Air Surveillance (ACAS)",
+    "Extended Squitter",
+    "Extended Squitter/Non-Transponder",
+    "Military Extended Squitter",
+    "Comm-B Altitude Reply",
+    "Comm-B Identity Reply",
+    "Reserved for Military Use",
+    "Reserved",
+    "Comm-D (ELM)",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+)
+
+# (DF 0, 16) Vertical Status, 1 bit
+# (3.1.2.8.2.1)
+VS_STR_LUT = (
+    "In Air",
+    "On Ground",
+)
+
+# (DF 0, 16) Reply Information, 4 bits
+# (3.1.2.8.2.2)
+RI_STR_LUT = (
+    "Reply to Interr UF=0 AQ=0, No Operating ACAS",
+    "Reserved for ACAS",
+    "Reserved for ACAS",
+    "Reserved for ACAS",
+    "Reserved for ACAS",
+    "Reserved for ACAS",
+    "Reserved for ACAS",
+    "Reserved for ACAS",
+    "Reply to Interr UF=0 AQ=1, No Max Speed Available",
+    "Reply to Interr UF=0 AQ=1, max(v) < 75 kt",
+    "Reply to Interr UF=0 AQ=1, 75 < max(v) < 150 kt",
+    "Reply to Interr UF=0 AQ=1, 150 < max(v) < 300 kt",
+    "Reply to Interr UF=0 AQ=1, 300 < max(v) < 600 kt",
+    "Reply to Interr UF=0 AQ=1, 600 < max(v) < 1200 kt",
+    "Reply to Interr UF=0 AQ=1, max(v) > 1200 kt",
+    "Not Assigned",
+)
+
+# (DF 0) Crosslink Capability, 1 bit
+# (3.1.2.8.2.3)
+CC_STR_LUT = (
+    "Does Not Support Crosslink Capability",
+    "Does Support Crosslink Capability",
+)
+
+# (DF 4, 20) Flight Status, 3 bits
+# (3.1.2.6.5.1)
+FS_STR_LUT = (
+    "No Alert, No SPI, In Air",
+    "No Alert, No SPI, On Ground",
+    "Alert, No SPI, In Air",
+    "Alert, No SPI, On Ground",
+    "Alert, SPI, On Ground or In Air",
+    "No Alert, SPI, On Ground or In Air",
+    "Reserved",
+    "Not Assigned",
+)
+
+# (DF 4, 20) Downlink Request, 5 bits
+# (3.1.2.6.5.2)
+DR_STR_LUT = (
+    "No Downlink Request",
+    "Request to Send Comm-B Message",
+    "Reserved for ACAS",
+    "Reserved for ACAS",
+    "Comm-B Broadcast Message 1 Available",
+    "Comm-B Broadcast Message 2 Available",
+    "Reserved for ACAS",
+    "Reserved for ACAS",
+    "Not Assigned",
+    "Not Assigned",
+    "Not Assigned",
+    "Not Assigned",
+    "Not Assigned",
+    "Not Assigned",
+    "Not Assigned",
+    "Not Assigned",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+    "Downlink ELM",
+)
+
+# (DF 4, 20) Indentifier Designator Subfield, 2 bits
+# (3.1.2.6.5.3.1)
+IDS_STR_LUT = (
+    "No Information",
+    "IIS Contains Comm-B II Code",
+    "IIS Contains Comm-C II Code",
+    "IIS Contains Comm-D II Code",
+)
+
+# (DF 17) Capability, 3 bits
+# (3.1.2.5.2.2.1)
+CA_STR_LUT = (
+    "Level 1 Transponder, Cannot Set CA 7, On Ground or In Air",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Level 2 or Above Transponder, Can Set CA 7, On Ground",
+    "Level 2 or Above Transponder, Can Set CA 7, In Air",
+    "Level 2 or Above Transponder, Can Set CA 7, On Ground or In Air",
+    "DR != 0 or FS in [2,3,4,5], On Ground or In Air",
+)
+
+# (DF 18) CF Field, 3 bits
+CF_STR_LUT = (
+    "AA Field is the ICAO Address",
+    "AA Field is an Anonymous Address",
+    "Fine TIS-B Message Using ICAO Address",
+    "Coarse TIS-B Airborne Position/Velocity Message",
+    "TIS-B and ADS-R Management Message",
+    "Fine TIS-B Using Non-ICAO Address",
+    "ADS-B Rebroadcast",
+    "Reserved",
+)
+
+# (DF 19) Application Field, 3 bits
+AF_STR_LUT = (
+    "ADS-B Message",
+    "Reserved for Military Use",
+    "Reserved for Military Use",
+    "Reserved for Military Use",
+    "Reserved for Military Use",
+    "Reserved for Military Use",
+    "Reserved for Military Use",
+    "Reserved for Military Use",
+)
+
+# (DF 17,18,19) Type Code, 5 bits
+TC_STR_LUT = (
+    "No Position Information",
+    "Identification (Category Set D)",
+    "Identification (Category Set C)",
+    "Identification (Category Set B)",
+    "Identification (Category Set A)",
+    "Surface Position",
+    "Surface Position",
+    "Surface Position",
+    "Surface Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Velocity",
+    "Airborne Position",
+    "Airborne Position",
+    "Airborne Position",
+    "Reserved for Test Purposes",
+    "Reserved for Surface System Status",
+    "Reserved",
+    "Reserved",
+    "Reserved",
+    "Extended Squitter Aircraft Emergency Priority Status",
+    "Reserved",
+    "Reserved",
+    "Aircraft Operational Status",
+)
+
+# (DF 17,18,19) Surveillance Status, 2 bits
+# (2.2.3.2.3.2)
+SS_STR_LUT = (
+    "No Condition Information",
+    "Permanent Alert Condition (Emergency)",
+    "Temporary Alert Condition",
+    "Special Position Identification (SPI) Condition",
+)
+
+# (DF 17,18,19) Time, 1 bit
+# (2.2.3.2.3.5)
+T_STR_LUT = (
+    "Not Synced to 0.2s UTC Epoch",
+    "Synced to 0.2s UTC Epoch",
+)
+
+# (DF 17,18,19) Callsign, 48 bits (6 bits per character)
+# (3.1.2.9.1.2)
+CALLSIGN_CHAR_LUT = "_ABCDEFGHIJKLMNOPQRSTUVWXYZ_____ _______________0123456789______"
+CALLSIGN_CHAR_ARRAY = np.array(list(CALLSIGN_CHAR_LUT))
+CALLSIGN_SHIFTS = tuple(range(42, -6, -6)) # Character shifts in the 48-bit field, first character first
+CALLSIGN_CACHE_SIZE = 4096 # Max callsigns cached before the cache is cleared
+
+MAX_NUM_BITS = 112
+FT_PER_METER = 3.28084
+NM_PER_DEG = 60.0
+
+# Downlink formats decoded with each decoder message filter
+MESSAGE_FILTER_DFS = {
+    "All Messages": (0, 4, 5, 11, 16, 17, 18, 19, 20, 21, 24),
+    "Extended Squitter Only": (17, 18, 19),
+}
+
+# CPR latitude zone sizes, in degrees
+CPR_DLAT_EVEN = 360.0/60
+CPR_DLAT_ODD = 360.0/59
+
+# Latitudes where the number of CPR longitude zones (NL) decreases by one,
+# starting at NL = 59 for latitudes below the first entry
+# (1090-WP30-18-DRAFT_DO-260B-V42, A.1.7.2.d)
+CPR_NL_LAT = (
+    10.47047130, 14.82817437, 18.18626357, 21.02939493, 23.54504487, 25.82924707,
+    27.93898710, 29.91135686, 31.77209708, 33.53993436, 35.22899598, 36.85025108,
+    38.41241892, 39.92256684, 41.38651832, 42.80914012, 44.19454951, 45.54626723,
+    46.86733252, 48.16039128, 49.42776439, 50.67150166, 51.89342469, 53.09516153,
+    54.27817472, 55.44378444, 56.59318756, 57.72747354, 58.84763776, 59.95459277,
+    61.04917774, 62.13216659, 63.20427479, 64.26616523, 65.31845310, 66.36171008,
+    67.39646774, 68.42322022, 69.44242631, 70.45451075, 71.45986473, 72.45884545,
+    73.45177442, 74.43893416, 75.42056257, 76.39684391, 77.36789461, 78.33374083,
+    79.29428225, 80.24923213, 81.19801349, 82.13956981, 83.07199445, 83.99173563,
+    84.89166191, 85.75541621, 86.53536998, 87.00000000,
+)
+CPR_NL_LAT_ARRAY = np.array(CPR_NL_LAT)
+
+# CRC polynomial (0x1FFF409) = 1 + x^3 + x^10 + x^12 + x^13 + x^14 + x^15 + x^16 + x^17 + x^18 + x^19 + x^20 + x^21 + x^22 + x^23 + x^24
+CRC_POLY = 0xFFF409
+
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 16
+        for _ in range(8):
+            crc <<= 1
+            if crc & 0x1000000:
+                crc ^= CRC_POLY
+        table.append(crc & 0xFFFFFF)
+    return tuple(table)
+
+CRC_TABLE = _crc_table()
+
+
+def crc24(data):
+    """
+    Mode S CRC of the given bytes, computed a byte at a time.
+
+    References:
+        http://www.radarspotters.eu/forum/index.php?topic=5617.msg41293#msg41293
+        http://www.eurocontrol.int/eec/gallery/content/public/document/eec/report/1994/022_CRC_calculations_for_Mode_S.pdf
+    """
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFF) ^ CRC_TABLE[(crc >> 16) ^ byte]
+    return crc
+
+
+def syndrome(frame, num_bits):
+    """
+    CRC of the data bits XORed with the 24 parity bits. This is 0 for a
+    PI frame received without errors and the ICAO address for an AP frame.
+    """
+    num_bytes = num_bits // 8
+    return crc24(frame[0:num_bytes-3]) ^ int.from_bytes(frame[num_bytes-3:num_bytes], "big")
+
+
+def _crc_syndromes(num_bits, max_burst_length):
+    # Syndromes of all contiguous bit error bursts, used for conservative
+    # error correction
+    lut = dict()
+    for burst_length in range(1, max_burst_length+1):
+        for ii in range(0, num_bits-burst_length+1):
+            error = 0
+            for jj in range(ii, ii+burst_length):
+                error |= 1 << (num_bits - 1 - jj)
+            error_syndrome = syndrome(error.to_bytes(num_bits // 8, "big"), num_bits)
+            if error_syndrome in lut:
+                raise ValueError("FEC syndrome collision {}".format(lut[error_syndrome]))
+            lut[error_syndrome] = tuple(range(ii, ii+burst_length))
+    return lut
+
+CRC_SYNDROMES = {
+    56: _crc_syndromes(56, 2),
+    112: _crc_syndromes(112, 2),
+}
+
+# Parity type and number of bits, indexed by DF. AP = Address/Parity,
+# PI = Parity/Interrogator ID. None is an unsupported DF.
+PARITY_AP = 0
+PARITY_PI = 1
+PARITY_LUT = [None]*32
+for _df in [0, 4, 5]:
+    PARITY_LUT[_df] = (PARITY_AP, 56)
+PARITY_LUT[11] = (PARITY_PI, 56)
+for _df in [16, 20, 21, 24]:
+    PARITY_LUT[_df] = (PARITY_AP, 112)
+for _df in [17, 18, 19]:
+    PARITY_LUT[_df] = (PARITY_PI, 112)
+
+
+def bits(value, num_bits, start, length):
+    """
+    Extract `length` bits starting at bit `start` (0 is the MSB) from a
+    `num_bits` long integer.
+    """
+    return (value >> (num_bits - start - length)) & ((1 << length) - 1)
+
+
+class DecodedMessage(object):
+    """
+    Fields decoded from a single Mode S frame. Fields that do not apply to
+    the frame's DF or TC are None.
+
+    `kind` says what the message carries: "acas", "surveillance", "all_call",
+    "identification", "airborne_position", "airborne_velocity", "unknown"
+    (a TC or CF that is not decoded yet) or None.
+    """
+    __slots__ = (
+        "timestamp", "frame", "df", "num_bits", "crc_passed", "corrected_bits", "parity",
+        "icao", "kind",
+        "ca", "cf", "af", "vs", "ri", "cc", "fs", "dr", "iis", "ids", "identity", "vds1", "vds2", "mv", "mb",
+        "altitude", "tc", "callsign", "ss", "nic_sb", "time_bit", "cpr_format", "lat_cpr", "lon_cpr",
+        "st", "ic", "vr_src", "speed", "heading", "vertical_rate", "latitude", "longitude",
+    )
+
+    def __init__(self, frame, timestamp):
+        for name in self.__slots__:
+            setattr(self, name, None)
+        self.frame = frame
+        self.timestamp = timestamp
+        self.crc_passed = False
+
+    def __repr__(self):
+        fields = ", ".join("{}={!r}".format(name, getattr(self, name)) for name in self.__slots__ if name != "frame" and getattr(self, name) is not None)
+        return "DecodedMessage({})".format(fields)
+
+
+def decode_df(frame):
+    # Downlink Format, 5 bits
+    return frame[0] >> 3
+
+
+def frame_address(frame):
+    """
+    The 24-bit ICAO address of a frame without decoding it. This is the AA
+    field for PI frames (DF 11, 17, 18, 19) and the address recovered from
+    the AP field for the others, which is only meaningful if the frame has
+    no bit errors. Returns -1 for unsupported DFs.
+    """
+    parity = PARITY_LUT[frame[0] >> 3]
+    if parity is None:
+        return -1
+
+    (parity_type, num_bits) = parity
+    if parity_type == PARITY_PI:
+        return int.from_bytes(frame[1:4], "big")
+    return syndrome(frame, num_bits)
+
+
+def decode_frame(frame, timestamp=None, known_addresses=(), error_corr="None"):
+    """
+    Decode a Mode S frame.
+
+    Arguments:
+        frame: The frame as bytes, 7 or 14 bytes long. Trailing bytes beyond
+            the DF's length are ignored.
+        timestamp: Reception time of the frame, carried through to the result.
+        known_addresses: Container of ICAO addresses (ints) an Address/Parity
+            frame's recovered address must be in for its CRC to pass.
+        error_corr: "Conservative" corrects 1 and 2 bit error bursts in
+            PI frames, anything else disables error correction.
+
+    Returns:
+        A DecodedMessage. The fields after the CRC are only decoded if
+        `crc_passed` is True.
+
+    References:
+        http://www.bucharestairports.ro/files/pages_files/Vol_IV_-_4yh_ed,_July_2007.pdf
+        http://www.icao.int/APAC/Documents/edocs/cns/SSR_%20modesii.pdf
+        http://www.anteni.net/adsb/Doc/1090-WP30-18-DRAFT_DO-260B-V42.pdf
+        http://jetvision.de/sbs/adsb/crc.htm
+        http://adsb-decode-guide.readthedocs.org/en/latest/introduction.html
+    """
+    msg = DecodedMessage(frame, timestamp)
+    msg.df = decode_df(frame)
+
+    parity = PARITY_LUT[msg.df]
+    if parity is None:
+        # Unsupported downlink format
+        return msg
+
+    (msg.parity, msg.num_bits) = parity
+    residual = syndrome(frame, msg.num_bits)
+
+    if msg.parity == PARITY_AP:
+        # The CRC XORed with the AP is the interrogated plane's ICAO address.
+        # If that address is known, it's safe to assume the CRC passes.
+        msg.icao = residual
+        msg.crc_passed = residual in known_addresses
+
+    else:
+        msg.crc_passed = residual == 0
+
+        if not msg.crc_passed and error_corr == "Conservative":
+            correct_burst_errors(msg, residual)
+
+    if msg.crc_passed:
+        value = int.from_bytes(msg.frame[0:msg.num_bits // 8], "big")
+        DF_DECODERS[msg.df](msg, value, msg.num_bits)
+
+    return msg
+
+
+def correct_burst_errors(msg, residual):
+    bits_to_change = CRC_SYNDROMES[msg.num_bits].get(residual)
+    if bits_to_change is None:
+        return
+
+    frame = bytearray(msg.frame)
+    for bit in bits_to_change:
+        frame[bit // 8] ^= 0x80 >> (bit % 8)
+    frame = bytes(frame)
+
+    # The fix may have changed the DF, only accept it if the frame is still
+    # a PI frame of the same length
+    if PARITY_LUT[decode_df(frame)] != (msg.parity, msg.num_bits):
+        return
+
+    msg.frame = frame
+    msg.df = decode_df(frame)
+    msg.corrected_bits = bits_to_change
+    msg.crc_passed = syndrome(frame, msg.num_bits) == 0
+
+
+# DF = 0  (3.1.2.8.2) Short Air-Air Surveillance (ACAS)
+# DF = 16 (3.1.2.8.3) Long Air-Air Surveillance (ACAS)
+def decode_acas(msg, value, num_bits):
+    msg.kind = "acas"
+
+    # Vertical Status, 1 bit
+    msg.vs = bits(value, num_bits, 5, 1)
+
+    # Reply Information, 4 bits
+    msg.ri = bits(value, num_bits, 13, 4)
+
+    # Altitude Code, 13 bits
+    msg.altitude = decode_ac13(bits(value, num_bits, 19, 13))
+
+    if msg.df == 0:
+        # Crosslink Capability, 1 bits
+        msg.cc = bits(value, num_bits, 6, 1)
+
+    else:
+        # (4.3.8.4.2.4)
+        msg.mv = bits(value, num_bits, 32, 56)
+        msg.vds1 = bits(value, num_bits, 32, 4)
+        msg.vds2 = bits(value, num_bits, 36, 4)
+
+
+# DF = 4 (3.1.2.6.5) Surveillance Altitude Reply
+# DF = 5 (3.1.2.6.7) Surveillance Identity Reply
+# DF = 20 (3.1.2.6.6) Comm-B Altitude Reply
+# DF = 21 (3.1.2.6.8) Comm-B Identity Reply
+def decode_surveillance(msg, value, num_bits):
+    msg.kind = "surveillance"
+
+    # Flight Status, 3 bits
+    msg.fs = bits(value, num_bits, 5, 3)
+
+    # Downlink Request, 5 bits
+    msg.dr = bits(value, num_bits, 8, 5)
+
+    # Utility Message, 6 bits
+    msg.iis = bits(value, num_bits, 13, 4)
+    msg.ids = bits(value, num_bits, 17, 2)
+
+    if msg.df in [4, 20]:
+        # Altitude Code, 13 bits
+        msg.altitude = decode_ac13(bits(value, num_bits, 19, 13))
+    else:
+        # (3.1.2.6.7.1) Identity Code, 13 bits
+        msg.identity = bits(value, num_bits, 19, 13)
+
+    if msg.df in [20, 21]:
+        # (3.1.2.6.6.1) Message Comm-B, 56 bits
+        msg.mb = bits(value, num_bits, 32, 56)
+
+
+# DF = 11 (3.1.2.5.2.2) All-Call Reply
+def decode_all_call(msg, value, num_bits):
+    msg.kind = "all_call"
+
+    # Capability, 3 bits
+    msg.ca = bits(value, num_bits, 5, 3)
+
+    # Address Announced (ICAO Address) 24 bits
+    msg.icao = bits(value, num_bits, 8, 24)
+
+
+# DF = 17 ADS-B Extended Squitter
+def decode_extended_squitter(msg, value, num_bits):
+    # Capability, 3 bits
+    msg.ca = bits(value, num_bits, 5, 3)
+
+    # Address Announced (ICAO Address) 24 bits
+    msg.icao = bits(value, num_bits, 8, 24)
+
+    # All CA types contain ADS-B messages
+    decode_me(msg, value, num_bits)
+
+
+# DF = 18 ADS-B Extended Squitter from a Non Mode-S transponder
+def decode_extended_squitter_non_transponder(msg, value, num_bits):
+    # CF Field, 3 bits
+    msg.cf = bits(value, num_bits, 5, 3)
+
+    # Address Announced (ICAO Address) 24 bits
+    msg.icao = bits(value, num_bits, 8, 24)
+
+    if msg.cf in [0, 1, 6]:
+        decode_me(msg, value, num_bits)
+    elif msg.cf in [2, 3, 5]:
+        # TIS-B, to be implemented
+        msg.kind = "unknown"
+
+
+# DF = 19 Military Extended Squitter
+def decode_military_extended_squitter(msg, value, num_bits):
+    # Application Field, 3 bits
+    msg.af = bits(value, num_bits, 5, 3)
+
+    # Address Announced (ICAO Address) 24 bits
+    msg.icao = bits(value, num_bits, 8, 24)
+
+    if msg.af == 0:
+        decode_me(msg, value, num_bits)
+
+
+# Message Extended Squitter, 56 bits
+def decode_me(msg, value, num_bits):
+    # Type Code, 5 bits
+    msg.tc = bits(value, num_bits, 32, 5)
+
+    ME_DECODERS[msg.tc](msg, value, num_bits)
+
+
+### No Position Information ###
+def decode_me_no_position(msg, value, num_bits):
+    pass
+
+
+### Aircraft Identification ###
+def decode_me_identification(msg, value, num_bits):
+    msg.kind = "identification"
+
+    # Callsign, 48 bits
+    msg.callsign = decode_callsign(bits(value, num_bits, 40, 48))
+
+
+# Decoded callsigns indexed by their 48-bit character field. An aircraft
+# sends the same callsign over and over, so this avoids building the string
+# each time and all aircraft state shares one interned copy of it.
+_callsign_cache = dict()
+
+def decode_callsign(chars):
+    """
+    Callsign from the 48-bit character field of an identification message.
+    There are 8 characters in the callsign, each is represented using 6
+    bits. Invalid characters are removed.
+    """
+    callsign = _callsign_cache.get(chars)
+    if callsign is None:
+        callsign = "".join([CALLSIGN_CHAR_LUT[(chars >> shift) & 0x3F] for shift in CALLSIGN_SHIFTS])
+        callsign = sys.intern(callsign.replace("_", ""))
+
+        if len(_callsign_cache) >= CALLSIGN_CACHE_SIZE:
+            _callsign_cache.clear()
+        _callsign_cache[chars] = callsign
+
+    return callsign
+
+
+def decode_callsigns(chars):
+    """
+    Callsigns from an array of 48-bit character fields, as an array of
+    strings.
+    """
+    chars = np.asarray(chars, dtype=np.uint64)
+    if chars.size == 0:
+        return np.zeros(0, dtype="<U8")
+
+    shifts = np.array(CALLSIGN_SHIFTS, dtype=np.uint64)
+    indices = (chars[:, np.newaxis] >> shifts) & np.uint64(0x3F)
+
+    # N x 8 characters viewed as N strings of 8 characters
+    callsigns = np.ascontiguousarray(CALLSIGN_CHAR_ARRAY[indices]).view("<U8").reshape(-1)
+    return np.char.replace(callsigns, "_", "")
+
+
+### Airborne Position (Baro Altitude) ###
+def decode_me_airborne_position(msg, value, num_bits):
+    msg.kind = "airborne_position"
+
+    # Surveillance Status, 2 bits
+    msg.ss = bits(value, num_bits, 37, 2)
+
+    # NIC Supplement-B, 1 bit
+    msg.nic_sb = bits(value, num_bits, 39, 1)
+
+    # Altitude, 12 bits
+    msg.altitude = decode_ac12(bits(value, num_bits, 40, 12))
+
+    # Time, 1 bit
+    msg.time_bit = bits(value, num_bits, 52, 1)
+
+    # CPR Odd/Even Frame Flag, 1 bit
+    msg.cpr_format = bits(value, num_bits, 53, 1)
+
+    # Latitude in CPR Format, 17 bits
+    msg.lat_cpr = bits(value, num_bits, 54, 17)
+
+    # Longitude in CPR Format, 17 bits
+    msg.lon_cpr = bits(value, num_bits, 71, 17)
+
+
+### Airborne Velocities ###
+def decode_me_airborne_velocity(msg, value, num_bits):
+    # Sub Type, 3 bits
+    msg.st = bits(value, num_bits, 37, 3)
+
+    # Ground velocity subtype
+    if msg.st in [1, 2]:
+        msg.kind = "airborne_velocity"
+
+        # Intent Change Flag, 1 bit
+        msg.ic = bits(value, num_bits, 40, 1)
+
+        # Velocity Sign East-West, 1 bit
+        s_ew = bits(value, num_bits, 45, 1)
+
+        # Velocity East-West, 10 bits
+        v_ew = bits(value, num_bits, 46, 10)
+
+        # Velocity Sign North-South, 1 bit
+        s_ns = bits(value, num_bits, 56, 1)
+
+        # Velocity North-South, 10 bits
+        v_ns = bits(value, num_bits, 57, 10)
+
+        # Vertical Rate Source, 1 bit
+        msg.vr_src = bits(value, num_bits, 67, 1)
+
+        # Vertical Rate Sign, 1 bit
+        s_vr = bits(value, num_bits, 68, 1)
+
+        # Vertical Rate, 9 bits
+        vr = bits(value, num_bits, 69, 9)
+
+        # Velocity West to East
+        velocity_we = (v_ew - 1)
+        # s_ew = 0, flying West ot East
+        # s_ew = 1, flying East to West
+        if s_ew == 1:
+            velocity_we *= -1 # Flip direction
+
+        # Velocity South to North
+        velocity_sn = (v_ns - 1)
+        # s_ns = 0, flying South to North
+        # s_ns = 1, flying North to South
+        if s_ns == 1:
+            velocity_sn *= -1 # Flip direction
+
+        # Speed (knots)
+        msg.speed = math.sqrt(velocity_sn**2 + velocity_we**2)
+
+        # Heading (degrees)
+        msg.heading = math.degrees(math.atan2(velocity_sn, velocity_we))
+
+        # Vertical Rate (ft/min)
+        msg.vertical_rate = (vr - 1)*64
+        # s_vr = 0, ascending
+        # s_vr = 1, descending
+        if s_vr == 1:
+            msg.vertical_rate *= -1
+
+
+### Surface Position, Airborne Position (GNSS Height), Status and Reserved ###
+def decode_me_unknown(msg, value, num_bits):
+    # To be implemented
+    msg.kind = "unknown"
+
+
+# Message decoders, indexed by DF
+DF_DECODERS = [None]*32
+for _df in [0, 16]:
+    DF_DECODERS[_df] = decode_acas
+for _df in [4, 5, 20, 21]:
+    DF_DECODERS[_df] = decode_surveillance
+DF_DECODERS[11] = decode_all_call
+DF_DECODERS[17] = decode_extended_squitter
+DF_DECODERS[18] = decode_extended_squitter_non_transponder
+DF_DECODERS[19] = decode_military_extended_squitter
+DF_DECODERS[24] = decode_me_no_position # Comm-D (ELM), to be implemented
+
+# Extended squitter message decoders, indexed by TC
+ME_DECODERS = [decode_me_unknown]*32
+ME_DECODERS[0] = decode_me_no_position
+for _tc in range(1, 5):
+    ME_DECODERS[_tc] = decode_me_identification
+for _tc in range(9, 19):
+    ME_DECODERS[_tc] = decode_me_airborne_position
+ME_DECODERS[19] = decode_me_airborne_velocity
+
+
+def decode_gillham(ac):
+    """
+    Altitude in ft of a 13-bit altitude code with M = 0 and Q = 0, which is
+    Gillham (Mode C) coded in 100 ft increments. Returns -1 for invalid codes.
+    """
+    # Bit order is C1 A1 C2 A2 C4 A4 M B1 Q B2 D2 B4 D4
+    (c1, a1, c2, a2, c4, a4, _, b1, _, b2, d2, b4, d4) = [(ac >> (12 - ii)) & 1 for ii in range(13)]
+
+    if c1 == c2 == c4 == 0:
+        # C1 to C4 can't all be zero
+        return -1
+
+    # The 100 ft increments are a 5-cycle Gray code in C1 C2 C4
+    one_hundreds = (c1*0b111) ^ (c2*0b011) ^ (c4*0b001)
+    if one_hundreds & 0b101 == 0b101:
+        one_hundreds ^= 0b010
+    if one_hundreds > 5:
+        return -1
+
+    # The 500 ft increments are Gray coded in D2 D4 A1 A2 A4 B1 B2 B4
+    five_hundreds = 0
+    for (bit, mask) in [(d2, 0xFF), (d4, 0x7F), (a1, 0x3F), (a2, 0x1F), (a4, 0x0F), (b1, 0x07), (b2, 0x03), (b4, 0x01)]:
+        if bit:
+            five_hundreds ^= mask
+
+    # The 100 ft increments count down in odd 500 ft increments
+    if five_hundreds & 1:
+        one_hundreds = 6 - one_hundreds
+
+    return (five_hundreds*5 + one_hundreds - 13)*100
+
+
+def _decode_ac13(ac):
+    if ac == 0:
+        # If all 13 altitude bits are 0, then the altitude field is invalid
+        return -1
+
+    # M-bit, 1 bit
+    m_bit = (ac >> 6) & 1
+
+    if m_bit == 1:
+        # The altitude is in meters. Remove the M-bit from the altitude bits.
+        n = ((ac & 0x1F80) >> 1) | (ac & 0x003F)
+        return int(round(n*FT_PER_METER))
+
+    # Q-bit, 1 bit
+    q_bit = (ac >> 4) & 1
+
+    if q_bit == 0:
+        # (3.1.1.7.12.2.3)
+        # Q-bit = 0, altitude is encoded in multiples of 100 ft
+        return decode_gillham(ac)
+
+    # (3.1.2.6.5.4, Chapter 3 Appendix)
+    # Q-bit = 1, altitude is encoded in multiples of 25 ft. Remove the Q-bit
+    # and M-bit from the altitude bits to calculate the altitude.
+    n = ((ac & 0x1F80) >> 2) | ((ac & 0x0020) >> 1) | (ac & 0x000F)
+
+    # Altitude in ft
+    return n*25 - 1000
+
+
+# Altitude in ft indexed by the 13-bit altitude code of DF 0, 4, 16 and 20,
+# and by the 12-bit altitude code of airborne position messages, which is the
+# 13-bit code without the M-bit. -1 is an invalid altitude.
+# http://www.eurocontrol.int/eec/gallery/content/public/document/eec/report/1995/002_Aircraft_Position_Report_using_DGPS_Mode-S.pdf
+ALTITUDE_AC13_LUT = tuple(_decode_ac13(ac) for ac in range(1 << 13))
+ALTITUDE_AC12_LUT = tuple(ALTITUDE_AC13_LUT[((ac & 0xFC0) << 1) | (ac & 0x03F)] for ac in range(1 << 12))
+
+
+# Altitude Code, 12 bits
+def decode_ac12(ac):
+    return ALTITUDE_AC12_LUT[ac]
+
+
+# (3.1.2.6.5.4) Altitude Code, 13 bits
+def decode_ac13(ac):
+    return ALTITUDE_AC13_LUT[ac]
+
+
+def cpr_nl(lat):
+    """
+    Number of longitude zones (NL) at the given latitude, found by binary
+    search over the NL transition latitudes.
+    """
+    if lat < 0:
+        lat = -lat
+
+    return 59 - bisect.bisect_right(CPR_NL_LAT, lat)
+
+
+def cpr_nl_array(lat):
+    """
+    Vectorized cpr_nl() for an array of latitudes.
+    """
+    return 59 - np.searchsorted(CPR_NL_LAT_ARRAY, np.abs(lat), side="right")
+
+
+def cpr_n(nl, frame):
+    # frame = 0, even frame
+    # frame = 1, odd frame
+    n = nl - frame
+
+    if n > 1:
+        return n
+    else:
+        return 1
+
+
+# http://www.eurocontrol.int/eec/gallery/content/public/document/eec/report/1995/002_Aircraft_Position_Report_using_DGPS_Mode-S.pdf
+def cpr_global(lat_cpr_even, lon_cpr_even, lat_cpr_odd, lon_cpr_odd, most_recent):
+    """
+    Globally unambiguous position from an even and an odd CPR frame.
+    `most_recent` is the CPR format (0 even, 1 odd) of the newer frame.
+
+    Returns:
+        (lat, lon), NaNs if the frames are in different latitude zones.
+    """
+    # Get fractional lat/lon for the even and odd frame
+    lat_cpr_even = float(lat_cpr_even)/131072
+    lon_cpr_even = float(lon_cpr_even)/131072
+    lat_cpr_odd = float(lat_cpr_odd)/131072
+    lon_cpr_odd = float(lon_cpr_odd)/131072
+
+    # Calculate the latitude index
+    j = math.floor(59*lat_cpr_even - 60*lat_cpr_odd + 0.5)
+
+    lat_even = CPR_DLAT_EVEN*((j % 60) + lat_cpr_even)
+    if lat_even >= 270:
+        lat_even -= 360
+
+    lat_odd = CPR_DLAT_ODD*((j % 59) + lat_cpr_odd)
+    if lat_odd >= 270:
+        lat_odd -= 360
+
+    nl = cpr_nl(lat_even)
+
+    if nl != cpr_nl(lat_odd):
+        # Even/odd latitudes are not in the same latitude zones, wait for
+        # more data
+        return (np.nan, np.nan)
+
+    # Calculate the longitude index. Both latitudes share the same NL.
+    m = math.floor(lon_cpr_even*(nl-1) - lon_cpr_odd*nl + 0.5)
+
+    # Use the most recent latitude
+    if most_recent == 0:
+        lat = lat_even
+        ni = cpr_n(nl, 0)
+        lon = (360.0/ni)*((m % ni) + lon_cpr_even)
+    else:
+        lat = lat_odd
+        ni = cpr_n(nl, 1)
+        lon = (360.0/ni)*((m % ni) + lon_cpr_odd)
+
+    if lon >= 180.0:
+        lon -= 360.0
+
+    return (lat, lon)
+
+
+def cpr_local(cpr_format, lat_cpr, lon_cpr, ref_lat, ref_lon):
+    """
+    Position from a single CPR frame, relative to a reference position
+    within 180 NM (half a latitude zone) of the aircraft.
+
+    References:
+        1090-WP30-18-DRAFT_DO-260B-V42, A.1.7.5
+    """
+    lat_cpr = float(lat_cpr)/131072
+    lon_cpr = float(lon_cpr)/131072
+
+    # Latitude zone closest to the reference latitude
+    dlat = CPR_DLAT_ODD if cpr_format else CPR_DLAT_EVEN
+    j = math.floor(ref_lat/dlat) + math.floor(0.5 + (ref_lat % dlat)/dlat - lat_cpr)
+    lat = dlat*(j + lat_cpr)
+
+    # Longitude zone closest to the reference longitude
+    dlon = 360.0/cpr_n(cpr_nl(lat), cpr_format)
+    m = math.floor(ref_lon/dlon) + math.floor(0.5 + (ref_lon % dlon)/dlon - lon_cpr)
+    lon = dlon*(m + lon_cpr)
+
+    return (lat, lon)
+
+
+def distance_nm(lat1, lon1, lat2, lon2):
+    """
+    Approximate distance between two nearby positions in nautical miles.
+    """
+    dlat = lat1 - lat2
+    dlon = (lon1 - lon2 + 180.0) % 360.0 - 180.0
+    dlon *= math.cos(math.radians((lat1 + lat2)/2.0))
+    return NM_PER_DEG*math.sqrt(dlat**2 + dlon**2)
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Parallel frame decoding. Frames are sharded by aircraft address across worker
+processes, each owning the aircraft state for its share of addresses, and the
+results are merged back in the order the frames were submitted.
+
+Frames are submitted in the order the demodulator emits them, which is
+timestamp order for a single source, so submission order is also timestamp
+order and the merge doesn't need to compare timestamps.
+"""
+
+import heapq
+import logging
+import multiprocessing
+import queue
+import threading
+
+from .addresses import ADDRESS_TTL_S
+from .modes import decode_frame, frame_address
+from .tracker import CPR_LOCAL_MAX_RANGE_NM, AircraftTracker
+
+BATCH_SIZE = 64 # Frames sent to a worker at a time
+BATCH_TIMEOUT_S = 0.05 # Max time a frame waits for its batch to fill
+CLOSE_TIMEOUT_S = 5.0 # Max time close() waits for each worker to exit once its frames are decoded
+
+logger = logging.getLogger(__name__)
+
+
+def decode_worker(frames, results, error_corr, ref_lat, ref_lon, keep_failed, wall_clock, address_ttl, receiver_range):
+    tracker = AircraftTracker(ref_lat, ref_lon, wall_clock, address_ttl, receiver_range)
+
+    while True:
+        batch = frames.get()
+        if batch is None:
+            break
+
+        decoded = []
+        for (seq, frame, timestamp) in batch:
+            msg = decode_frame(frame, timestamp, tracker.known_addresses(timestamp), error_corr)
+            plane = None
+            if not msg.crc_passed and not keep_failed:
+                # Don't send the failed message back, only its sequence number
+                msg = None
+            elif msg.crc_passed:
+                plane = tracker.update(msg)
+                if plane is not None:
+                    # Send back a snapshot, without the CPR history
+                    plane = plane.copy()
+                    plane.pop("cpr", None)
+            decoded.append((seq, msg, plane))
+
+        results.put(decoded)
+
+
+class ShardedDecoder(object):
+    """
+    Decodes frames in `num_workers` processes. Frames are submitted with
+    submit() and `callback(msg, plane, context)` is called from a collector
+    thread for every frame, in submission order. `plane` is a snapshot of the
+    aircraft if the frame produced new state to publish, otherwise None.
+    Frames that fail the CRC are only called back if `keep_failed` is True.
+
+    If a worker process dies, the frames it hadn't returned and any later
+    frames of its shard are skipped and counted in `num_lost`, so the others
+    keep being called back and close() doesn't wait for them. Exceptions
+    raised by the callback are logged and counted in `num_errors`.
+    """
+    def __init__(self, num_workers, callback, error_corr="None", ref_lat=None, ref_lon=None, keep_failed=True, wall_clock=False, address_ttl=ADDRESS_TTL_S, receiver_range=CPR_LOCAL_MAX_RANGE_NM, batch_size=BATCH_SIZE, batch_timeout=BATCH_TIMEOUT_S):
+        self.num_workers = num_workers
+        self.callback = callback
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+
+        # Spawn rather than fork, the parent process is multithreaded
+        context = multiprocessing.get_context("spawn")
+        self.results = context.Queue()
+        self.frames = []
+        self.workers = []
+        for _ in range(num_workers):
+            frames = context.Queue()
+            worker = context.Process(target=decode_worker, args=(frames, self.results, error_corr, ref_lat, ref_lon, keep_failed, wall_clock, address_ttl, receiver_range))
+            worker.daemon = True
+            worker.start()
+            self.frames.append(frames)
+            self.workers.append(worker)
+
+        # Frames waiting to be sent to each worker
+        self.lock = threading.Lock()
+        self.batches = [[] for _ in range(num_workers)]
+
+        # Shard and context of frames not yet returned, keyed by sequence
+        # number
+        self.pending = dict()
+        self.next_seq = 0
+
+        # Shards whose worker died
+        self.dead_shards = set()
+        self.num_lost = 0
+        self.num_errors = 0
+
+        # Reorder buffer of decoded frames, so callbacks happen in submission
+        # order
+        self.reorder = []
+        self.next_callback_seq = 0
+
+        self.running = True
+        self.collector = threading.Thread(target=self.collect)
+        self.collector.daemon = True
+        self.collector.start()
+
+
+    def submit(self, frame, timestamp, context=None):
+        # Shard by the AA field for PI frames and by the address recovered from
+        # the AP field for the others
+        shard = frame_address(frame) % self.num_workers
+
+        with self.lock:
+            if shard in self.dead_shards:
+                self.num_lost += 1
+                return
+
+            seq = self.next_seq
+            self.next_seq += 1
+            self.pending[seq] = (shard, context)
+
+            batch = self.batches[shard]
+            batch.append((seq, frame, timestamp))
+            if len(batch) >= self.batch_size:
+                self.frames[shard].put(batch)
+                self.batches[shard] = []
+
+
+    def flush(self):
+        with self.lock:
+            for shard in range(self.num_workers):
+                if self.batches[shard] and shard not in self.dead_shards:
+                    self.frames[shard].put(self.batches[shard])
+                    self.batches[shard] = []
+
+
+    def collect(self):
+        while self.running or self.next_callback_seq < self.next_seq:
+            try:
+                self.reorder_results(self.results.get(timeout=self.batch_timeout))
+            except queue.Empty:
+                # Send partially filled batches so frames aren't held back
+                # when traffic is light
+                self.flush()
+
+            # Checked on every pass, under steady traffic the results queue
+            # is never empty
+            self.check_workers()
+            self.release()
+
+
+    def reorder_results(self, decoded):
+        with self.lock:
+            for item in decoded:
+                # Frames of a dead shard may already have been skipped
+                if item[0] in self.pending:
+                    heapq.heappush(self.reorder, item)
+
+
+    def check_workers(self):
+        dead = [shard for (shard, worker) in enumerate(self.workers) if shard not in self.dead_shards and not worker.is_alive()]
+        if not dead:
+            return
+
+        # An exited worker's last results are already in the results queue,
+        # the frames it didn't return are lost
+        while True:
+            try:
+                self.reorder_results(self.results.get_nowait())
+            except queue.Empty:
+                break
+
+        for shard in dead:
+            exitcode = self.workers[shard].exitcode
+            if self.running or exitcode != 0:
+                logger.error("Decoder worker %d exited with code %s, skipping its frames", shard, exitcode)
+            with self.lock:
+                self.dead_shards.add(shard)
+                self.batches[shard] = []
+
+
+    def release(self):
+        # Call back the decoded frames that are next in order, skipping the
+        # frames of dead shards
+        while True:
+            with self.lock:
+                if self.reorder and self.reorder[0][0] == self.next_callback_seq:
+                    (seq, msg, plane) = heapq.heappop(self.reorder)
+                    (shard, context) = self.pending.pop(seq)
+                elif self.pending.get(self.next_callback_seq, (None,))[0] in self.dead_shards:
+                    del self.pending[self.next_callback_seq]
+                    self.next_callback_seq += 1
+                    self.num_lost += 1
+                    continue
+                else:
+                    break
+            self.next_callback_seq += 1
+            if msg is not None:
+                try:
+                    self.callback(msg, plane, context)
+                except Exception:
+                    # Keep collecting, one bad frame mustn't stop decoding
+                    logger.exception("Sharded decoder callback failed")
+                    self.num_errors += 1
+
+
+    def close(self):
+        """
+        Decode the submitted frames and stop the workers. When it returns
+        every frame has been called back or counted as lost, so the callback
+        isn't called anymore.
+        """
+        # The workers decode their remaining frames and exit, which the
+        # collector notices once it has their results
+        with self.lock:
+            self.running = False
+            for shard in range(self.num_workers):
+                if shard not in self.dead_shards:
+                    if self.batches[shard]:
+                        self.frames[shard].put(self.batches[shard])
+                        self.batches[shard] = []
+                    self.frames[shard].put(None)
+        self.collector.join()
+
+        for worker in self.workers:
+            worker.join(CLOSE_TIMEOUT_S)
+            if worker.is_alive():
+                worker.terminate()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+import logging
+
+import numpy as np
+import pmt
+from gnuradio import gr
+
+from .modes import frame_address
+
+logger = logging.getLogger(__name__)
+
+
+def parse_set(values, base=10):
+    """
+    A set of ints from an iterable of ints or strings, or from a string of
+    comma or whitespace separated values. None or an empty string is None,
+    meaning the rule is disabled.
+    """
+    if values is None:
+        return None
+    if isinstance(values, str):
+        values = values.replace(",", " ").split()
+        if not values:
+            return None
+
+    return set(int(value, base) if isinstance(value, str) else int(value) for value in values)
+
+
+class FramePrefilter(object):
+    """
+    Accepts or rejects packed Mode S frames on their raw bits, before any
+    decoding. Each rule is disabled when None:
+
+        dfs         Downlink formats to accept
+        icao_allow  ICAO addresses to accept
+        icao_deny   ICAO addresses to reject
+        tcs         Extended squitter (DF 17, 18 and DF 19 with AF 0) type
+                    codes to accept, other frames are not affected
+
+    Rules are checked cheapest first and the ICAO address, which needs a CRC
+    for Address/Parity frames, is only computed if an ICAO rule is set. The
+    number of frames rejected by each rule and passed is kept in `hits`.
+    """
+    def __init__(self, dfs=None, icao_allow=None, icao_deny=None, tcs=None):
+        self.dfs = parse_set(dfs)
+        self.icao_allow = parse_set(icao_allow, 16)
+        self.icao_deny = parse_set(icao_deny, 16)
+        self.tcs = parse_set(tcs)
+
+        # Accepted DFs as a table, indexed by DF
+        self.df_enabled = [self.dfs is None or df in self.dfs for df in range(32)]
+        self.check_icao = self.icao_allow is not None or self.icao_deny is not None
+
+        self.hits = {"df": 0, "tc": 0, "icao_allow": 0, "icao_deny": 0, "passed": 0}
+
+
+    def accept(self, frame):
+        df = frame[0] >> 3
+        if not self.df_enabled[df]:
+            self.hits["df"] += 1
+            return False
+
+        # DF 19 with AF 0 carries the same ME field as DF 17 and 18
+        if self.tcs is not None and (df in (17, 18) or (df == 19 and frame[0] & 0x07 == 0)) and (frame[4] >> 3) not in self.tcs:
+            self.hits["tc"] += 1
+            return False
+
+        if self.check_icao:
+            icao = frame_address(frame)
+            if self.icao_allow is not None and icao not in self.icao_allow:
+                self.hits["icao_allow"] += 1
+                return False
+            if self.icao_deny is not None and icao in self.icao_deny:
+                self.hits["icao_deny"] += 1
+                return False
+
+        self.hits["passed"] += 1
+        return True
+
+
+class prefilter(gr.sync_block):
+    """
+    Drops demodulated frames by DF, ICAO address or type code before they
+    reach the decoder. See FramePrefilter.
+    """
+    def __init__(self, dfs=None, icao_allow=None, icao_deny=None, tcs=None):
+        gr.sync_block.__init__(self, name="ADS-B Prefilter", in_sig=None, out_sig=None)
+
+        self.prefilter = FramePrefilter(dfs, icao_allow, icao_deny, tcs)
+
+        self.message_port_register_in(pmt.to_pmt("demodulated"))
+        self.message_port_register_out(pmt.to_pmt("demodulated"))
+        self.set_msg_handler(pmt.to_pmt("demodulated"), self.filter_packet)
+
+
+    def filter_packet(self, pdu):
+        bits = pmt.to_python(pmt.cdr(pdu))
+        if self.prefilter.accept(np.packbits(bits).tobytes()):
+            self.message_port_pub(pmt.to_pmt("demodulated"), pdu)
+
+
+    def stop(self):
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Prefilter hits: %s", self.prefilter.hits)
+        return True
+
+
+    def hits(self):
+        return dict(self.prefilter.hits)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Native ZMQ publishing of decoded aircraft updates, without PMT serialization,
+so consumers don't need GNU Radio.
+"""
+
+import json
+import math
+
+from .wire import encode_plane
+
+try:
+    import zmq
+except ImportError:
+    zmq = None
+
+
+PUB_FORMATS = ["JSON", "Binary"]
+
+# Topic DF family, indexed by DF
+DF_FAMILY_LUT = ["modes"]*32
+for _df in [17, 18, 19]:
+    DF_FAMILY_LUT[_df] = "es"
+
+
+def topic(plane):
+    """
+    The topic an aircraft update is published under, "<family>/<kind>/<icao>",
+    e.g. "es/airborne_position/4840d6". The family is "es" for extended
+    squitters (DF 17, 18, 19) and "modes" for the other replies, the kind is
+    the kind of the message that updated the aircraft.
+    """
+    return "{}/{}/{}".format(DF_FAMILY_LUT[plane.get("df", 0)], plane.get("kind"), plane["icao"])
+
+
+def json_line(plane):
+    # NaN isn't valid JSON, send unknown values as null
+    plane = {key: (None if isinstance(value, float) and math.isnan(value) else value) for (key, value) in plane.items()}
+    return json.dumps(plane) + "\n"
+
+
+class ZmqPublisher(object):
+    """
+    Publishes aircraft updates on a ZMQ PUB socket bound to `address`, e.g.
+    "tcp://127.0.0.1:5002". Each update is a two frame message, its topic
+    (see topic()) and either a JSON line or a binary record (see adsb.wire).
+    Subscribers filter by topic prefix, e.g. "es/" or
+    "es/airborne_position/", so ZMQ drops unwanted updates before they are
+    sent.
+    """
+    def __init__(self, address, pub_format="JSON"):
+        if zmq is None:
+            raise RuntimeError("Publishing on {} requires pyzmq".format(address))
+        if pub_format not in PUB_FORMATS:
+            raise ValueError("Unknown publish format {}".format(pub_format))
+
+        self.address = address
+        self.encode = encode_plane if pub_format == "Binary" else json_line
+        self.context = zmq.Context.instance()
+        self.socket = self.context.socket(zmq.PUB)
+        self.socket.bind(address)
+
+
+    def publish(self, plane):
+        payload = self.encode(plane)
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.socket.send_multipart([topic(plane).encode(), payload])
+
+
+    def close(self):
+        self.socket.close(linger=0)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy as np
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.addresses import AddressTable
+from gnuradio.adsb.batch import decode_batch
+from gnuradio.adsb.modes import crc24
+
+# Example frames from http://adsb-decode-guide.readthedocs.org
+IDENTIFICATION_FRAME = bytes.fromhex("8D4840D6202CC371C32CE0576098")
+POSITION_EVEN_FRAME = bytes.fromhex("8D40621D58C382D690C8AC2863A7")
+POSITION_ODD_FRAME = bytes.fromhex("8D40621D58C386435CC412692AD6")
+VELOCITY_FRAME = bytes.fromhex("8D485020994409940838175B284F")
+
+def altitude_reply(icao):
+    # DF 4 altitude reply, the AP is the CRC XORed with the ICAO address
+    data = bytes.fromhex("20001838")
+    return data + (crc24(data) ^ icao).to_bytes(3, "big")
+
+def frame_matrix(frames):
+    return np.frombuffer(b"".join(frame.ljust(14, b"\0") for frame in frames), dtype=np.uint8).reshape(-1, 14)
+
+class qa_batch(gr_unittest.TestCase):
+
+    def test_001_decode(self):
+        corrupt = bytearray(VELOCITY_FRAME)
+        corrupt[8] ^= 0x01
+        frames = [IDENTIFICATION_FRAME, POSITION_EVEN_FRAME, POSITION_ODD_FRAME, VELOCITY_FRAME, altitude_reply(0x4840d6), bytes(corrupt)]
+        columns = decode_batch(frame_matrix(frames), [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+
+        self.assertEqual(list(columns["crc_passed"]), [True, True, True, True, True, False])
+        self.assertEqual(list(columns["df"]), [17, 17, 17, 17, 4, 17])
+        self.assertEqual(list(columns["icao"]), [0x4840d6, 0x40621d, 0x40621d, 0x485020, 0x4840d6, -1])
+        self.assertEqual(list(columns["tc"]), [4, 11, 11, 19, -1, -1])
+        self.assertEqual(columns["callsign"][0], "KLM1023 ")
+        self.assertEqual(columns["altitude"][1], 38000)
+        self.assertAlmostEqual(columns["speed"][3], 159.2, 1)
+        self.assertEqual(columns["vertical_rate"][3], -832)
+
+        # Only the second frame of the even/odd pair has a global position
+        self.assertTrue(np.isnan(columns["latitude"][1]))
+        self.assertAlmostEqual(columns["latitude"][2], 52.26578, 4)
+        self.assertAlmostEqual(columns["longitude"][2], 3.93891, 4)
+
+    def test_002_cpr_timeout(self):
+        columns = decode_batch(frame_matrix([POSITION_EVEN_FRAME, POSITION_ODD_FRAME]), [0.0, 100.0])
+        self.assertTrue(np.isnan(columns["latitude"]).all())
+
+    def test_003_address_table(self):
+        # The decoder's address table, only addresses within the TTL count
+        addresses = AddressTable(ttl=60)
+        addresses.add(0x4840d6, 1000.0)
+        addresses.add(0x40621d, 1050.0)
+        addresses.set_time(1070.0)
+        frames = [altitude_reply(0x4840d6), altitude_reply(0x40621d)]
+        columns = decode_batch(frame_matrix(frames), [1070.0, 1070.0], addresses)
+        self.assertEqual(list(columns["crc_passed"]), [False, True])
+        self.assertEqual(list(columns["icao"]), [-1, 0x40621d])
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_batch)
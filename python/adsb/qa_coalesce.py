@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.coalesce import PublishCoalescer
+
+class qa_coalesce(gr_unittest.TestCase):
+
+    def test_001_latest_per_key(self):
+        published = []
+        # Long interval, so only close() flushes
+        coalescer = PublishCoalescer(published.append, 3600)
+        for ii in range(10):
+            coalescer.update("a", ii)
+            coalescer.update("b", -ii)
+        coalescer.close()
+
+        self.assertEqual(published, [9, -9])
+        stats = coalescer.stats()
+        self.assertEqual(stats["updates"], 20)
+        self.assertEqual(stats["published"], 2)
+        self.assertEqual(stats["pending"], 0)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_coalesce)
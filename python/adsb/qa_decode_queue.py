@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import threading
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.decode_queue import DecodeQueue
+
+class qa_decode_queue(gr_unittest.TestCase):
+
+    def setUp(self):
+        # Holds the worker in the callback until released
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.decoded = []
+
+    def callback(self, item):
+        self.started.set()
+        self.release.wait()
+        self.decoded.append(item)
+
+    def fill(self, policy, snrs):
+        q = DecodeQueue(self.callback, 3, policy)
+        # The first item is taken by the worker, which then blocks
+        q.put("busy", 0.0)
+        self.started.wait()
+        for (ii, snr) in enumerate(snrs):
+            q.put(ii, snr)
+        self.release.set()
+        q.close()
+        return q
+
+    def test_001_drop_oldest(self):
+        q = self.fill("Drop Oldest", [10, 20, 30, 40, 50])
+        self.assertEqual(self.decoded, ["busy", 2, 3, 4])
+        stats = q.stats()
+        self.assertEqual(stats["dropped"], 2)
+        self.assertEqual(stats["max_depth"], 3)
+        self.assertEqual(stats["processed"], 4)
+
+    def test_002_drop_lowest_snr(self):
+        q = self.fill("Drop Lowest SNR", [30, 10, 20, 40, 5])
+        self.assertEqual(self.decoded, ["busy", 0, 2, 3])
+        self.assertEqual(q.stats()["dropped"], 2)
+
+    def test_003_block(self):
+        q = DecodeQueue(self.callback, 2, "Block")
+        self.release.set()
+        for ii in range(100):
+            q.put(ii)
+        q.close()
+        self.assertEqual(self.decoded, list(range(100)))
+        self.assertEqual(q.stats()["dropped"], 0)
+
+    def test_004_callback_error(self):
+        # A failing callback is logged and the worker keeps going
+        decoded = []
+        def callback(item):
+            if item == 3:
+                raise ValueError("bad frame")
+            decoded.append(item)
+
+        q = DecodeQueue(callback, 10, "Block")
+        with self.assertLogs("gnuradio.adsb.decode_queue", level="ERROR"):
+            for ii in range(6):
+                q.put(ii)
+            q.close()
+        self.assertEqual(decoded, [0, 1, 2, 4, 5])
+        self.assertEqual(q.stats()["errors"], 1)
+        self.assertEqual(q.stats()["processed"], 6)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_decode_queue)
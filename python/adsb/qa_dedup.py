@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.dedup import FrameDeduplicator
+
+FRAME_A = bytes.fromhex("8D4840D6202CC371C32CE0576098")
+FRAME_B = bytes.fromhex("8D485020994409940838175B284F")
+
+class qa_dedup(gr_unittest.TestCase):
+
+    def test_001_window(self):
+        dedup = FrameDeduplicator(0.5)
+        self.assertFalse(dedup.is_duplicate(FRAME_A, 10.0))
+        self.assertTrue(dedup.is_duplicate(FRAME_A, 10.000001))
+        self.assertFalse(dedup.is_duplicate(FRAME_B, 10.1))
+        self.assertTrue(dedup.is_duplicate(FRAME_A, 10.4))
+        # FRAME_A has expired, FRAME_B hasn't
+        self.assertFalse(dedup.is_duplicate(FRAME_A, 10.55))
+        self.assertTrue(dedup.is_duplicate(FRAME_B, 10.55))
+
+        stats = dedup.stats()
+        self.assertEqual(stats["lookups"], 6)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["entries"], 2)
+        self.assertAlmostEqual(stats["hit_rate"], 0.5)
+
+    def test_002_max_entries(self):
+        dedup = FrameDeduplicator(10.0, max_entries=1)
+        self.assertFalse(dedup.is_duplicate(FRAME_A, 0.0))
+        self.assertFalse(dedup.is_duplicate(FRAME_B, 0.0))
+        self.assertFalse(dedup.is_duplicate(FRAME_A, 0.0))
+        self.assertEqual(dedup.stats()["entries"], 1)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_dedup)
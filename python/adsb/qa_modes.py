@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.modes import decode_frame, cpr_global, cpr_local, cpr_nl, crc24, decode_ac12, decode_ac13, decode_callsign, decode_callsigns
+
+# Example frames from http://adsb-decode-guide.readthedocs.org
+IDENTIFICATION_FRAME = bytes.fromhex("8D4840D6202CC371C32CE0576098")
+POSITION_EVEN_FRAME = bytes.fromhex("8D40621D58C382D690C8AC2863A7")
+POSITION_ODD_FRAME = bytes.fromhex("8D40621D58C386435CC412692AD6")
+VELOCITY_FRAME = bytes.fromhex("8D485020994409940838175B284F")
+
+class qa_modes(gr_unittest.TestCase):
+
+    def test_001_identification(self):
+        msg = decode_frame(IDENTIFICATION_FRAME)
+        self.assertTrue(msg.crc_passed)
+        self.assertEqual(msg.df, 17)
+        self.assertEqual(msg.icao, 0x4840d6)
+        self.assertEqual(msg.kind, "identification")
+        self.assertEqual(msg.callsign.strip(), "KLM1023")
+
+    def test_002_airborne_position(self):
+        even = decode_frame(POSITION_EVEN_FRAME)
+        odd = decode_frame(POSITION_ODD_FRAME)
+        self.assertEqual(even.kind, "airborne_position")
+        self.assertEqual((even.cpr_format, odd.cpr_format), (0, 1))
+        self.assertEqual(even.altitude, 38000)
+
+        (lat, lon) = cpr_global(even.lat_cpr, even.lon_cpr, odd.lat_cpr, odd.lon_cpr, 0)
+        self.assertAlmostEqual(lat, 52.25720, 4)
+        self.assertAlmostEqual(lon, 3.91937, 4)
+
+        (lat, lon) = cpr_local(even.cpr_format, even.lat_cpr, even.lon_cpr, 52.0, 4.0)
+        self.assertAlmostEqual(lat, 52.25720, 4)
+        self.assertAlmostEqual(lon, 3.91937, 4)
+
+    def test_003_airborne_velocity(self):
+        msg = decode_frame(VELOCITY_FRAME)
+        self.assertEqual(msg.kind, "airborne_velocity")
+        self.assertAlmostEqual(msg.speed, 159.2, 1)
+        self.assertEqual(msg.vertical_rate, -832)
+
+    def test_004_address_parity(self):
+        # DF 4 altitude reply, the AP is the CRC XORed with the ICAO address
+        data = bytes.fromhex("20001838")
+        frame = data + (crc24(data) ^ 0x4840d6).to_bytes(3, "big")
+        self.assertFalse(decode_frame(frame).crc_passed)
+        msg = decode_frame(frame, known_addresses={0x4840d6})
+        self.assertTrue(msg.crc_passed)
+        self.assertEqual(msg.icao, 0x4840d6)
+
+    def test_005_error_correction(self):
+        frame = bytearray(IDENTIFICATION_FRAME)
+        frame[6] ^= 0x20
+        self.assertFalse(decode_frame(bytes(frame)).crc_passed)
+        msg = decode_frame(bytes(frame), error_corr="Conservative")
+        self.assertTrue(msg.crc_passed)
+        self.assertEqual(msg.corrected_bits, (50,))
+        self.assertEqual(msg.frame, IDENTIFICATION_FRAME)
+
+    def test_006_cpr_nl(self):
+        self.assertEqual(cpr_nl(0.0), 59)
+        self.assertEqual(cpr_nl(-52.25720), 36)
+        self.assertEqual(cpr_nl(87.0), 1)
+
+    def test_007_altitude(self):
+        # 25 ft increments
+        self.assertEqual(decode_ac12(0xC38), 38000)
+        # Gillham coded, C1 C2 C4 count 100 ft increments as a Gray code
+        self.assertEqual(decode_ac13(0x0100), -1200) # C4
+        self.assertEqual(decode_ac13(0x0400), -1000) # C2
+        self.assertEqual(decode_ac13(0x1000), -800) # C1
+        # Counted down in odd 500 ft increments
+        self.assertEqual(decode_ac13(0x1400 | 0x0002), -600) # C1 C2 B4
+        self.assertEqual(decode_ac13(0x0000), -1)
+        # Meters
+        self.assertEqual(decode_ac13((1 << 6) | ((1000 & 0xFC0) << 1) | (1000 & 0x3F)), 3281)
+
+    def test_008_callsign(self):
+        chars = int.from_bytes(IDENTIFICATION_FRAME[5:11], "big")
+        self.assertEqual(decode_callsign(chars), "KLM1023 ")
+        # Repeated callsigns are the same object
+        self.assertIs(decode_callsign(chars), decode_frame(IDENTIFICATION_FRAME).callsign)
+        self.assertEqual(list(decode_callsigns([chars, 0])), ["KLM1023 ", ""])
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_modes)
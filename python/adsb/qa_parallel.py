@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import threading
+import time
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.modes import crc24
+from gnuradio.adsb.parallel import ShardedDecoder
+
+IDENTIFICATION_FRAME = bytes.fromhex("8D4840D6202CC371C32CE0576098")
+
+def identification(icao):
+    # The identification frame re-addressed to another aircraft
+    data = IDENTIFICATION_FRAME[0:1] + icao.to_bytes(3, "big") + IDENTIFICATION_FRAME[4:11]
+    return data + crc24(data).to_bytes(3, "big")
+
+def altitude_reply(icao):
+    # DF 4 altitude reply, the AP is the CRC XORed with the ICAO address
+    data = bytes.fromhex("20001838")
+    return data + (crc24(data) ^ icao).to_bytes(3, "big")
+
+class Collector(object):
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, msg, plane, context):
+        with self.lock:
+            self.calls.append((msg, plane, context))
+
+class qa_parallel(gr_unittest.TestCase):
+
+    def test_001_submission_order(self):
+        collector = Collector()
+        decoder = ShardedDecoder(3, collector, batch_size=7)
+        for ii in range(500):
+            decoder.submit(identification(0x400000 + ii % 50), 1000.0 + ii, ii)
+        decoder.close()
+
+        self.assertEqual([context for (msg, plane, context) in collector.calls], list(range(500)))
+        self.assertTrue(all(msg.crc_passed for (msg, plane, context) in collector.calls))
+        for worker in decoder.workers:
+            self.assertFalse(worker.is_alive())
+            self.assertEqual(worker.exitcode, 0)
+
+    def test_002_shard_address_state(self):
+        # The AP frame goes to the shard that saw the aircraft's DF 17
+        collector = Collector()
+        decoder = ShardedDecoder(4, collector, keep_failed=True)
+        decoder.submit(altitude_reply(0x4840d6), 999.0, "unknown")
+        for ii in range(8):
+            decoder.submit(identification(0x400000 + ii), 1000.0, "other")
+        decoder.submit(identification(0x4840d6), 1000.0, "identification")
+        decoder.submit(altitude_reply(0x4840d6), 1001.0, "altitude")
+        decoder.close()
+
+        results = {context: msg for (msg, plane, context) in collector.calls}
+        self.assertFalse(results["unknown"].crc_passed)
+        self.assertTrue(results["altitude"].crc_passed)
+        self.assertEqual(results["altitude"].icao, 0x4840d6)
+
+    def test_003_keep_failed(self):
+        collector = Collector()
+        decoder = ShardedDecoder(2, collector, keep_failed=False)
+        decoder.submit(altitude_reply(0x4840d6), 1000.0, "failed")
+        decoder.submit(identification(0x4840d6), 1001.0, "passed")
+        decoder.close()
+        self.assertEqual([context for (msg, plane, context) in collector.calls], ["passed"])
+
+    def test_004_dead_worker(self):
+        # Frames of a dead worker's shard are skipped, the others still
+        # arrive in order and close() returns
+        collector = Collector()
+        decoder = ShardedDecoder(2, collector, batch_size=1000)
+        decoder.workers[0].terminate()
+        decoder.workers[0].join()
+
+        icaos = [0x400000 + ii for ii in range(20)]
+        for (ii, icao) in enumerate(icaos):
+            decoder.submit(identification(icao), 1000.0 + ii, icao)
+        decoder.close()
+
+        expected = [icao for icao in icaos if icao % 2 == 1]
+        self.assertEqual([context for (msg, plane, context) in collector.calls], expected)
+        self.assertEqual(decoder.num_lost, len(icaos) - len(expected))
+
+    def test_005_callback_error(self):
+        # A failing callback is logged and the later frames still arrive
+        collector = Collector()
+        def callback(msg, plane, context):
+            if context == 3:
+                raise ValueError("callback failed")
+            collector(msg, plane, context)
+
+        decoder = ShardedDecoder(2, callback)
+        with self.assertLogs("gnuradio.adsb.parallel") as logs:
+            for ii in range(10):
+                decoder.submit(identification(0x400000 + ii), 1000.0 + ii, ii)
+            decoder.close()
+
+        self.assertEqual([context for (msg, plane, context) in collector.calls], [0, 1, 2, 4, 5, 6, 7, 8, 9])
+        self.assertEqual(decoder.num_errors, 1)
+        self.assertIn("callback failed", logs.output[0])
+
+    def test_006_dead_worker_under_load(self):
+        # A worker dying while results keep arriving from the others is
+        # noticed without the results queue running empty, which it never
+        # does for this long batch timeout
+        collector = Collector()
+        decoder = ShardedDecoder(2, collector, batch_size=4, batch_timeout=60.0)
+        for ii in range(200):
+            decoder.submit(identification(0x400000 + ii % 20), 1000.0 + ii, ii)
+        decoder.workers[0].terminate()
+        decoder.workers[0].join()
+        deadline = time.time() + 10.0
+        for ii in range(200, 4000):
+            decoder.submit(identification(0x400000 + ii % 20), 1000.0 + ii, ii)
+            while ii == 3000 and 0 not in decoder.dead_shards and time.time() < deadline:
+                time.sleep(0.01)
+        self.assertIn(0, decoder.dead_shards)
+        decoder.close()
+        self.assertEqual(len(decoder.reorder), 0)
+
+        odd = [context for (msg, plane, context) in collector.calls if (0x400000 + context % 20) % 2 == 1]
+        self.assertEqual(len(odd), 2000)
+        self.assertEqual(len(collector.calls) + decoder.num_lost, 4000)
+
+    def test_007_close_drains(self):
+        # close() returns once every frame is called back, however long
+        # decoding takes, and nothing is called back after it
+        collector = Collector()
+        decoder = ShardedDecoder(2, collector)
+        for ii in range(20000):
+            decoder.submit(identification(0x400000 + ii % 50), 1000.0 + ii, ii)
+        decoder.close()
+        self.assertEqual(len(collector.calls), 20000)
+        self.assertFalse(decoder.collector.is_alive())
+        self.assertEqual(decoder.num_lost, 0)
+        for worker in decoder.workers:
+            self.assertEqual(worker.exitcode, 0)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_parallel)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.prefilter import FramePrefilter
+
+IDENTIFICATION_FRAME = bytes.fromhex("8D4840D6202CC371C32CE0576098") # DF 17, TC 4, 4840d6
+VELOCITY_FRAME = bytes.fromhex("8D485020994409940838175B284F") # DF 17, TC 19, 485020
+ALL_CALL_FRAME = bytes.fromhex("5D4840D6A3B2C1") # DF 11, 4840d6
+
+class qa_prefilter(gr_unittest.TestCase):
+
+    def test_001_df(self):
+        prefilter = FramePrefilter(dfs=[17, 18])
+        self.assertTrue(prefilter.accept(IDENTIFICATION_FRAME))
+        self.assertFalse(prefilter.accept(ALL_CALL_FRAME))
+        self.assertEqual(prefilter.hits["df"], 1)
+        self.assertEqual(prefilter.hits["passed"], 1)
+
+    def test_002_icao(self):
+        prefilter = FramePrefilter(icao_allow="4840d6, 485020", icao_deny=["485020"])
+        self.assertTrue(prefilter.accept(IDENTIFICATION_FRAME))
+        self.assertTrue(prefilter.accept(ALL_CALL_FRAME))
+        self.assertFalse(prefilter.accept(VELOCITY_FRAME))
+        self.assertEqual(prefilter.hits["icao_deny"], 1)
+
+        prefilter = FramePrefilter(icao_allow=[0x485020])
+        self.assertFalse(prefilter.accept(IDENTIFICATION_FRAME))
+        self.assertEqual(prefilter.hits["icao_allow"], 1)
+
+    def test_003_tc(self):
+        prefilter = FramePrefilter(tcs="19")
+        self.assertFalse(prefilter.accept(IDENTIFICATION_FRAME))
+        self.assertTrue(prefilter.accept(VELOCITY_FRAME))
+        # Type codes don't apply to other DFs
+        self.assertTrue(prefilter.accept(ALL_CALL_FRAME))
+        self.assertEqual(prefilter.hits["tc"], 1)
+
+    def test_004_tc_military(self):
+        # DF 19 with AF 0 carries the same ME field, other AFs don't
+        prefilter = FramePrefilter(tcs="19")
+        self.assertFalse(prefilter.accept(bytes([19 << 3]) + IDENTIFICATION_FRAME[1:]))
+        self.assertTrue(prefilter.accept(bytes([19 << 3]) + VELOCITY_FRAME[1:]))
+        self.assertTrue(prefilter.accept(bytes([(19 << 3) | 1]) + IDENTIFICATION_FRAME[1:]))
+        self.assertEqual(prefilter.hits["tc"], 1)
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_prefilter)
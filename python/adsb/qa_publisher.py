@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+import json
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.publisher import json_line, topic
+
+class qa_publisher(gr_unittest.TestCase):
+
+    def test_001_topic(self):
+        self.assertEqual(topic({"icao": "4840d6", "df": 17, "kind": "airborne_position"}), "es/airborne_position/4840d6")
+        self.assertEqual(topic({"icao": "4840d6", "df": 18, "kind": "identification"}), "es/identification/4840d6")
+        self.assertEqual(topic({"icao": "3c6dd0", "df": 11, "kind": "all_call"}), "modes/all_call/3c6dd0")
+
+    def test_002_json_line(self):
+        nan = float("nan")
+        line = json_line({"icao": "4840d6", "altitude": 38000, "latitude": nan, "callsign": "KLM1023 "})
+        self.assertTrue(line.endswith("\n"))
+        self.assertEqual(line.count("\n"), 1)
+        plane = json.loads(line)
+        self.assertEqual(plane["altitude"], 38000)
+        self.assertIsNone(plane["latitude"])
+        self.assertEqual(plane["callsign"], "KLM1023 ")
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_publisher)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import numpy as np
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.modes import crc24, decode_frame
+from gnuradio.adsb.tracker import AircraftTracker, CPR_TIMEOUT_S
+
+POSITION_EVEN_FRAME = bytes.fromhex("8D40621D58C382D690C8AC2863A7")
+POSITION_ODD_FRAME = bytes.fromhex("8D40621D58C386435CC412692AD6")
+IDENTIFICATION_FRAME = bytes.fromhex("8D4840D6202CC371C32CE0576098")
+
+def altitude_reply(icao):
+    # DF 4 altitude reply, the AP is the CRC XORed with the ICAO address
+    data = bytes.fromhex("20001838")
+    return data + (crc24(data) ^ icao).to_bytes(3, "big")
+
+class qa_tracker(gr_unittest.TestCase):
+
+    def test_001_cpr_pair(self):
+        tracker = AircraftTracker()
+        self.assertIsNone(tracker.update(decode_frame(POSITION_EVEN_FRAME, 1000.0)))
+        plane = tracker.update(decode_frame(POSITION_ODD_FRAME, 1001.0))
+        self.assertAlmostEqual(plane["latitude"], 52.26578, 4)
+        self.assertAlmostEqual(plane["longitude"], 3.93891, 4)
+        self.assertEqual(plane["last_seen"], 1001.0)
+
+    def test_002_cpr_timeout(self):
+        # The pair is too far apart in sample time, however fast it's replayed
+        tracker = AircraftTracker()
+        tracker.update(decode_frame(POSITION_EVEN_FRAME, 1000.0))
+        plane = tracker.update(decode_frame(POSITION_ODD_FRAME, 1000.0 + CPR_TIMEOUT_S + 1))
+        self.assertIsNone(plane)
+
+    def test_003_known_address_ttl(self):
+        tracker = AircraftTracker(address_ttl=60)
+        frame = altitude_reply(0x4840d6)
+        self.assertFalse(decode_frame(frame, 1000.0, tracker.known_addresses(1000.0)).crc_passed)
+
+        tracker.update(decode_frame(IDENTIFICATION_FRAME, 1000.0))
+        self.assertTrue(decode_frame(frame, 1030.0, tracker.known_addresses(1030.0)).crc_passed)
+
+        # The address expires, whatever the aircraft state holds
+        self.assertFalse(decode_frame(frame, 1061.0, tracker.known_addresses(1061.0)).crc_passed)
+        self.assertIn("4840d6", tracker.aircraft)
+
+        stats = tracker.addresses.stats()
+        self.assertEqual(stats["lookups"], 3)
+        self.assertEqual(stats["accepts"], 1)
+
+    def test_004_receiver_range(self):
+        # 16 NM from the receiver, decoded from the first frame
+        tracker = AircraftTracker(ref_lat=52.0, ref_lon=4.0)
+        plane = tracker.update(decode_frame(POSITION_EVEN_FRAME, 1000.0))
+        self.assertAlmostEqual(plane["latitude"], 52.25720, 4)
+        self.assertAlmostEqual(plane["longitude"], 3.91937, 4)
+
+        # 200 NM away, more than half a zone, the local decode lands 160 NM
+        # away on the other side of the receiver
+        for receiver_range in [180, 150]:
+            tracker = AircraftTracker(ref_lat=55.6, ref_lon=4.0, receiver_range=receiver_range)
+            plane = tracker.update(decode_frame(POSITION_EVEN_FRAME, 1000.0))
+            if receiver_range == 180:
+                self.assertGreater(plane["latitude"], 58.0)
+            else:
+                self.assertIsNone(plane)
+
+    def test_005_invalid_altitude(self):
+        # The same position with its altitude code zeroed, an invalid altitude
+        data = bytearray(POSITION_ODD_FRAME[0:11])
+        data[5] = 0
+        data[6] &= 0x0f
+        frame = bytes(data) + crc24(bytes(data)).to_bytes(3, "big")
+        self.assertEqual(decode_frame(frame, 1001.0).altitude, -1)
+
+        tracker = AircraftTracker()
+        tracker.update(decode_frame(POSITION_EVEN_FRAME, 1000.0))
+        plane = tracker.update(decode_frame(frame, 1001.0))
+        self.assertEqual(plane["altitude"], 38000)
+
+        tracker = AircraftTracker()
+        tracker.update(decode_frame(frame, 1000.0))
+        self.assertTrue(np.isnan(tracker.aircraft["40621d"]["altitude"]))
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_tracker)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+from gnuradio import gr_unittest
+from gnuradio.adsb.wire import RECORD, decode_plane, decode_planes, encode_plane
+
+class qa_wire(gr_unittest.TestCase):
+
+    def test_001_round_trip(self):
+        plane = {
+            "icao": "4840d6", "df": 17, "timestamp": 1500000000.25, "callsign": "KLM1023 ", "altitude": 38000,
+            "speed": 159.2011, "heading": -92.8804, "vertical_rate": -832, "latitude": 52.2657802, "longitude": 3.9389125,
+            "snr": 21.37, "num_msgs": 7,
+        }
+        record = encode_plane(plane)
+        self.assertEqual(len(record), RECORD.size)
+
+        decoded = decode_plane(record)
+        self.assertEqual(decoded["icao"], "4840d6")
+        self.assertEqual(decoded["timestamp"], 1500000000.25)
+        self.assertEqual(decoded["callsign"], "KLM1023 ")
+        self.assertEqual(decoded["altitude"], 38000)
+        self.assertAlmostEqual(decoded["speed"], 159.2, 1)
+        self.assertAlmostEqual(decoded["heading"], -92.88, 2)
+        self.assertEqual(decoded["vertical_rate"], -832)
+        self.assertAlmostEqual(decoded["latitude"], 52.265780, 6)
+        self.assertAlmostEqual(decoded["longitude"], 3.938912, 6)
+        self.assertEqual(decoded["num_msgs"], 7)
+
+    def test_002_unknown_fields(self):
+        nan = float("nan")
+        record = encode_plane({"icao": "000001", "altitude": nan, "latitude": nan, "longitude": nan, "speed": nan, "heading": nan})
+        planes = decode_planes(record*3)
+        self.assertEqual(len(planes), 3)
+        for name in ["callsign", "altitude", "speed", "heading", "latitude", "longitude"]:
+            self.assertIsNone(planes[0][name])
+
+
+if __name__ == '__main__':
+    gr_unittest.run(qa_wire)
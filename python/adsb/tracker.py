@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Aircraft state built from decoded Mode S messages (see adsb.modes).
+"""
+
+import logging
+import time
+
+import numpy as np
+
+from .addresses import ADDRESS_TTL_S, AddressTable
+from .modes import cpr_global, cpr_local, distance_nm
+
+CPR_TIMEOUT_S = 30 # Seconds consider CPR-encoded lat/lon info invalid
+CPR_LOCAL_MAX_RANGE_NM = 150 # Default max range from the receiver for a receiver-referenced local CPR decode
+CPR_LOCAL_MAX_SPEED_KT = 1000 # Max plausible ground speed for an aircraft-referenced local CPR decode
+PLANE_TIMEOUT_S = 1*60
+
+logger = logging.getLogger(__name__)
+
+
+class AircraftTracker(object):
+    """
+    Aircraft state keyed by ICAO address string. Each aircraft is a dict with
+    the callsign, altimetry and position last decoded for it.
+
+    Times (last seen, CPR frame times and timeouts) come from the message
+    timestamps, so recordings can be replayed at any rate. With `wall_clock`
+    set, the time messages are processed is used instead.
+
+    `addresses` is the table Address/Parity frames are validated against. It
+    is only filled from DF 11 and 17 frames that passed the CRC without
+    error correction and forgets addresses not heard for `address_ttl`
+    seconds, independently of the aircraft state.
+
+    A single CPR frame decoded relative to the receiver position is always
+    within half a zone (about 180 NM) of it, so an aircraft further than
+    about 360 - `receiver_range` NM away decodes to a wrong position. It's
+    only accepted within `receiver_range` NM of the receiver, which should
+    be kept well inside the half zone and near the receiver's real range.
+    """
+    def __init__(self, ref_lat=None, ref_lon=None, wall_clock=False, address_ttl=ADDRESS_TTL_S, receiver_range=CPR_LOCAL_MAX_RANGE_NM):
+        # Receiver reference position, used for local (single frame) CPR decoding
+        if ref_lat is not None and ref_lon is not None:
+            self.ref_lat = float(ref_lat)
+            self.ref_lon = float(ref_lon)
+        else:
+            self.ref_lat = np.nan
+            self.ref_lon = np.nan
+
+        # Max range (NM) of receiver-referenced local CPR decodes
+        self.receiver_range = receiver_range
+
+        self.wall_clock = wall_clock
+
+        self.aircraft = dict()
+
+        # ICAO addresses (ints) used to validate Address/Parity frames
+        self.addresses = AddressTable(address_ttl)
+
+        # Aircraft state updaters, indexed by message kind
+        self.updaters = {
+            "acas": self.update_altitude,
+            "surveillance": self.update_altitude,
+            "all_call": self.update_plane,
+            "identification": self.update_identification,
+            "airborne_position": self.update_airborne_position,
+            "airborne_velocity": self.update_airborne_velocity,
+        }
+
+
+    def update(self, msg):
+        """
+        Update the aircraft state with a decoded message whose CRC passed.
+
+        Returns:
+            The aircraft dict if the message produced new state that should
+            be published, otherwise None.
+        """
+        if msg.df in (11, 17) and msg.corrected_bits is None:
+            self.addresses.add(msg.icao, self.now(msg))
+
+        updater = self.updaters.get(msg.kind)
+        if updater is None:
+            return None
+
+        return updater(msg)
+
+
+    def now(self, msg):
+        return self.clock(msg.timestamp)
+
+
+    def clock(self, timestamp):
+        if self.wall_clock or timestamp is None:
+            return time.time()
+        return timestamp
+
+
+    def known_addresses(self, timestamp):
+        """
+        The address table for validating Address/Parity frames received at
+        `timestamp`.
+        """
+        self.addresses.set_time(self.clock(timestamp))
+        return self.addresses
+
+
+    def update_plane(self, msg):
+        aa_str = "{:06x}".format(msg.icao)
+
+        if aa_str in self.aircraft:
+            # The current plane already exists in the dictionary
+            plane = self.aircraft[aa_str]
+            plane["num_msgs"] += 1
+            plane["last_seen"] = self.now(msg)
+
+        else:
+            # Create empty dictionary for the current plane
+            plane = dict()
+            plane["callsign"] = None
+            self.reset_plane_altimetry(plane)
+
+            plane["num_msgs"] = 1
+            plane["last_seen"] = self.now(msg)
+
+            self.aircraft[aa_str] = plane
+
+        return plane
+
+
+    def reset_plane_altimetry(self, plane):
+        plane["altitude"] = np.nan
+        plane["speed"] = np.nan
+        plane["heading"] = np.nan
+        plane["vertical_rate"] = np.nan
+        plane["latitude"] = np.nan
+        plane["longitude"] = np.nan
+        plane["position_time"] = np.nan
+        plane["cpr"] = [(np.nan, np.nan, np.nan), (np.nan, np.nan, np.nan)]
+
+
+    def update_altitude(self, msg):
+        self.update_plane(msg)
+        if msg.altitude is not None and msg.altitude != -1:
+            # If the altitude is not invalid, log it
+            self.aircraft["{:06x}".format(msg.icao)]["altitude"] = msg.altitude
+
+
+    def update_identification(self, msg):
+        plane = self.update_plane(msg)
+        plane["callsign"] = msg.callsign
+        return plane
+
+
+    def update_airborne_velocity(self, msg):
+        plane = self.update_plane(msg)
+        plane["speed"] = msg.speed
+        plane["heading"] = msg.heading
+        plane["vertical_rate"] = msg.vertical_rate
+        return plane
+
+
+    def update_airborne_position(self, msg):
+        plane = self.update_plane(msg)
+        now = plane["last_seen"]
+        plane["cpr"][msg.cpr_format] = (msg.lat_cpr, msg.lon_cpr, now)
+
+        (lat, lon) = self.calculate_lat_lon(plane["cpr"], now)
+        if np.isnan(lat) or np.isnan(lon):
+            # No valid even/odd pair yet, decode this frame on its own
+            (lat, lon) = self.calculate_local_lat_lon(plane, msg.cpr_format, msg.lat_cpr, msg.lon_cpr, now)
+        msg.latitude = lat
+        msg.longitude = lon
+
+        # TODO: Temporary hack to make sure bad lat/lons don"t get published
+        if np.isnan(lat) == False and (np.isnan(plane["latitude"]) or abs(lat - plane["latitude"]) < 0.1):
+            valid_lat_lon = True
+        else:
+            # Figure out what went wrong
+            valid_lat_lon = False
+            logger.debug("Invalid lat/lon %s %s from CPR %s %s", lat, lon, msg.lat_cpr, msg.lon_cpr)
+
+        if msg.altitude is not None and msg.altitude != -1:
+            # Keep the last valid altitude rather than publish an invalid one
+            plane["altitude"] = msg.altitude
+        if np.isnan(lat) == False and np.isnan(lon) == False:
+            plane["latitude"] = lat
+            plane["longitude"] = lon
+            plane["position_time"] = now
+
+        if valid_lat_lon:
+            return plane
+        return None
+
+
+    def calculate_lat_lon(self, cpr, now):
+        # If the even and odd frame data is still valid, calculate the
+        # latitude and longitude
+        if (now - cpr[0][2]) < CPR_TIMEOUT_S and (now - cpr[1][2]) < CPR_TIMEOUT_S:
+            most_recent = 0 if (cpr[0][2] - cpr[1][2]) > 0 else 1
+            return cpr_global(cpr[0][0], cpr[0][1], cpr[1][0], cpr[1][1], most_recent)
+
+        return (np.nan, np.nan)
+
+
+    def calculate_local_lat_lon(self, plane, cpr_format, lat_cpr, lon_cpr, now):
+        """
+        Decode a single CPR frame relative to a reference position. The
+        aircraft's last known position is used if it is recent, otherwise the
+        receiver position. The result is rejected if it is implausibly far
+        from the reference.
+        """
+        position_age = now - plane["position_time"]
+        if position_age < CPR_TIMEOUT_S:
+            ref_lat = plane["latitude"]
+            ref_lon = plane["longitude"]
+            max_range = CPR_LOCAL_MAX_SPEED_KT*(position_age + 1)/3600.0
+        elif np.isnan(self.ref_lat) == False:
+            ref_lat = self.ref_lat
+            ref_lon = self.ref_lon
+            max_range = self.receiver_range
+        else:
+            return (np.nan, np.nan)
+
+        (lat, lon) = cpr_local(cpr_format, lat_cpr, lon_cpr, ref_lat, ref_lon)
+
+        if distance_nm(lat, lon, ref_lat, ref_lon) > max_range:
+            logger.debug("Local CPR decode %s %s out of range", lat, lon)
+            return (np.nan, np.nan)
+
+        return (lat, lon)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+
+"""
+Compact binary encoding of aircraft updates. Each update is one fixed-size
+little-endian record, with the ICAO address as an integer and the position,
+altitude and velocity quantized to integers. The layout is mirrored by the
+webserver and by decodePlaneRecord() in web/static/js/map.js.
+
+    Offset  Type     Field
+    0       uint8    Format version
+    1       uint8    Flags, which of the optional fields are valid
+    2       uint8    DF
+    3       uint8    Reserved
+    4       uint32   ICAO address
+    8       float64  Timestamp, seconds
+    16      int32    Latitude, 1e-6 deg
+    20      int32    Longitude, 1e-6 deg
+    24      int16    Altitude, 25 ft
+    26      uint16   Speed, 0.1 kt
+    28      int16    Heading, 0.01 deg counterclockwise from East
+    30      int16    Vertical rate, ft/min
+    32      int16    SNR, 0.01 dB
+    34      uint16   Reserved
+    36      uint32   Number of messages
+    40      char[8]  Callsign, ASCII
+"""
+
+import math
+import struct
+
+WIRE_VERSION = 1
+RECORD = struct.Struct("<BBBxIdiihHhhhxxI8s")
+
+# Flags, set if the field is valid
+FLAG_CALLSIGN = 0x01
+FLAG_ALTITUDE = 0x02
+FLAG_VELOCITY = 0x04
+FLAG_VERTICAL_RATE = 0x08
+FLAG_POSITION = 0x10
+FLAG_SNR = 0x20
+
+
+def valid(value):
+    return value is not None and not (isinstance(value, float) and math.isnan(value))
+
+
+def encode_plane(plane):
+    """
+    Encode an aircraft update, as published by the decoder, into a record.
+    """
+    flags = 0
+    callsign = b""
+    if valid(plane.get("callsign")):
+        flags |= FLAG_CALLSIGN
+        callsign = plane["callsign"].encode("ascii", "replace")
+
+    altitude = 0
+    if valid(plane.get("altitude")) and plane["altitude"] != -1:
+        flags |= FLAG_ALTITUDE
+        altitude = int(round(plane["altitude"]/25.0))
+
+    speed = 0
+    heading = 0
+    if valid(plane.get("speed")) and valid(plane.get("heading")):
+        flags |= FLAG_VELOCITY
+        speed = min(int(round(plane["speed"]*10)), 0xFFFF)
+        heading = int(round(plane["heading"]*100))
+
+    vertical_rate = 0
+    if valid(plane.get("vertical_rate")):
+        flags |= FLAG_VERTICAL_RATE
+        vertical_rate = int(plane["vertical_rate"])
+
+    latitude = 0
+    longitude = 0
+    if valid(plane.get("latitude")) and valid(plane.get("longitude")):
+        flags |= FLAG_POSITION
+        latitude = int(round(plane["latitude"]*1e6))
+        longitude = int(round(plane["longitude"]*1e6))
+
+    snr = 0
+    if valid(plane.get("snr")):
+        flags |= FLAG_SNR
+        snr = int(round(plane["snr"]*100))
+
+    return RECORD.pack(
+        WIRE_VERSION, flags, plane.get("df", 0), int(plane["icao"], 16), plane.get("timestamp", 0.0),
+        latitude, longitude, altitude, speed, heading, vertical_rate, snr, plane.get("num_msgs", 0), callsign,
+    )
+
+
+def decode_plane(buffer, offset=0):
+    """
+    Decode the record at `offset` into an aircraft update dict. Fields that
+    aren't valid are None.
+    """
+    (version, flags, df, icao, timestamp, latitude, longitude, altitude, speed, heading, vertical_rate, snr, num_msgs, callsign) = RECORD.unpack_from(buffer, offset)
+    if version != WIRE_VERSION:
+        raise ValueError("Unsupported wire format version {}".format(version))
+
+    has_velocity = flags & FLAG_VELOCITY
+    has_position = flags & FLAG_POSITION
+    return {
+        "icao": "{:06x}".format(icao),
+        "df": df,
+        "timestamp": timestamp,
+        "callsign": callsign.rstrip(b"\0").decode("ascii") if flags & FLAG_CALLSIGN else None,
+        "altitude": altitude*25 if flags & FLAG_ALTITUDE else None,
+        "speed": speed/10.0 if has_velocity else None,
+        "heading": heading/100.0 if has_velocity else None,
+        "vertical_rate": vertical_rate if flags & FLAG_VERTICAL_RATE else None,
+        "latitude": latitude/1e6 if has_position else None,
+        "longitude": longitude/1e6 if has_position else None,
+        "snr": snr/100.0 if flags & FLAG_SNR else None,
+        "num_msgs": num_msgs,
+    }
+
+
+def decode_planes(buffer):
+    """
+    Decode concatenated records.
+    """
+    return [decode_plane(buffer, offset) for offset in range(0, len(buffer) - RECORD.size + 1, RECORD.size)]
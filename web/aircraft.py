@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Aircraft state kept by the webserver, built from the decoder's published
+aircraft updates.
+"""
+
+import gzip
+import hashlib
+import json
+import math
+import time
+
+AIRCRAFT_TTL_S = 60 # Seconds an aircraft is kept after its last update
+SNAPSHOT_INTERVAL_S = 1.0 # Min seconds between regenerating /aircraft.json
+GRID_CELL_DEG = 1.0 # Size of the spatial index's lat/lon cells
+VIEWPORT_MARGIN = 0.2 # Margin added around a client's map bounds, as a fraction of their size
+DUPLICATE_WINDOW_S = 0.5 # Max timestamp difference of two receivers' reports of the same frame
+RATE_WINDOW_S = 10.0 # Seconds over which per-receiver message rates are measured
+
+# Aircraft state fields merged across receivers
+STATE_FIELDS = ["callsign", "altitude", "speed", "heading", "vertical_rate", "latitude", "longitude"]
+
+
+def sanitize(plane):
+    # NaN isn't valid JSON, send unknown values as null
+    return {key: (None if isinstance(value, float) and math.isnan(value) else value) for (key, value) in plane.items()}
+
+
+def dump1090_aircraft(plane, now):
+    """
+    An aircraft in the shape of dump1090's aircraft.json. Fields that aren't
+    known are left out.
+    """
+    aircraft = {"hex": plane["icao"], "messages": plane.get("num_msgs", 0), "seen": round(now - plane["received"], 1)}
+
+    if plane.get("callsign") is not None:
+        aircraft["flight"] = plane["callsign"]
+    if plane.get("altitude") is not None:
+        aircraft["alt_baro"] = plane["altitude"]
+    if plane.get("speed") is not None:
+        aircraft["gs"] = round(plane["speed"], 1)
+    if plane.get("heading") is not None:
+        # The decoder's heading is counterclockwise from East, dump1090's
+        # track is clockwise from North
+        aircraft["track"] = round((90.0 - plane["heading"]) % 360.0, 1)
+    if plane.get("vertical_rate") is not None:
+        aircraft["baro_rate"] = plane["vertical_rate"]
+    if plane.get("latitude") is not None and plane.get("longitude") is not None:
+        aircraft["lat"] = plane["latitude"]
+        aircraft["lon"] = plane["longitude"]
+    if plane.get("snr") is not None:
+        aircraft["rssi"] = plane["snr"]
+
+    return aircraft
+
+
+class Viewport(object):
+    """
+    A client's map bounds plus a margin. Longitudes may be unwrapped, as
+    Leaflet reports them after panning across the antimeridian.
+    """
+    def __init__(self, south, west, north, east, margin=VIEWPORT_MARGIN):
+        lat_margin = (north - south)*margin
+        lon_margin = (east - west)*margin
+        self.south = max(south - lat_margin, -90.0)
+        self.north = min(north + lat_margin, 90.0)
+
+        west -= lon_margin
+        east += lon_margin
+        if east - west >= 360.0:
+            self.lon_ranges = [(-180.0, 180.0)]
+        else:
+            west = (west + 180.0) % 360.0 - 180.0
+            east = (east + 180.0) % 360.0 - 180.0
+            if west <= east:
+                self.lon_ranges = [(west, east)]
+            else:
+                # Crosses the antimeridian
+                self.lon_ranges = [(west, 180.0), (-180.0, east)]
+
+
+    def contains(self, lat, lon):
+        if lat < self.south or lat > self.north:
+            return False
+        for (west, east) in self.lon_ranges:
+            if west <= lon <= east:
+                return True
+        return False
+
+
+    def cells(self, cell_deg=GRID_CELL_DEG):
+        """
+        Grid cells overlapping the viewport, as a list of (row, column).
+        """
+        rows = range(int(math.floor(self.south/cell_deg)), int(math.floor(self.north/cell_deg)) + 1)
+        cols = []
+        for (west, east) in self.lon_ranges:
+            cols.extend(range(int(math.floor(west/cell_deg)), int(math.floor(east/cell_deg)) + 1))
+        return [(row, col) for row in rows for col in cols]
+
+
+    def num_cells(self, cell_deg=GRID_CELL_DEG):
+        rows = int(math.floor(self.north/cell_deg)) - int(math.floor(self.south/cell_deg)) + 1
+        cols = sum(int(math.floor(east/cell_deg)) - int(math.floor(west/cell_deg)) + 1 for (west, east) in self.lon_ranges)
+        return rows*cols
+
+
+class GridIndex(object):
+    """
+    Spatial index of items keyed by ICAO, bucketed into lat/lon cells of
+    `cell_deg` degrees. Queries only look at the cells a viewport overlaps,
+    or at the occupied cells if there are fewer of them.
+    """
+    def __init__(self, cell_deg=GRID_CELL_DEG):
+        self.cell_deg = cell_deg
+        # Cell -> {icao: (lat, lon, value)}
+        self.cells = {}
+        # ICAO -> cell
+        self.locations = {}
+
+
+    def __len__(self):
+        return len(self.locations)
+
+
+    def update(self, icao, lat, lon, value=None):
+        cell = (int(math.floor(lat/self.cell_deg)), int(math.floor(lon/self.cell_deg)))
+        old_cell = self.locations.get(icao)
+        if old_cell is not None and old_cell != cell:
+            self.remove(icao)
+
+        self.cells.setdefault(cell, {})[icao] = (lat, lon, value)
+        self.locations[icao] = cell
+
+
+    def remove(self, icao):
+        cell = self.locations.pop(icao, None)
+        if cell is None:
+            return
+        items = self.cells[cell]
+        del items[icao]
+        if not items:
+            del self.cells[cell]
+
+
+    def query(self, viewport):
+        """
+        Values of the items inside the viewport.
+        """
+        if viewport.num_cells(self.cell_deg) < len(self.cells):
+            cells = (self.cells.get(cell) for cell in viewport.cells(self.cell_deg))
+        else:
+            cells = self.cells.values()
+
+        values = []
+        for items in cells:
+            if items:
+                values.extend(value for (lat, lon, value) in items.values() if viewport.contains(lat, lon))
+        return values
+
+
+def index_plane(grid, plane, value=None):
+    # Only aircraft with a position are indexed
+    if plane.get("latitude") is not None and plane.get("longitude") is not None:
+        grid.update(plane["icao"], plane["latitude"], plane["longitude"], plane if value is None else value)
+    else:
+        grid.remove(plane["icao"])
+
+
+class SourceStats(object):
+    """
+    Message counters and rate of one receiver.
+    """
+    def __init__(self, window=RATE_WINDOW_S):
+        self.window = window
+        self.num_messages = 0
+        self.num_merged = 0
+        self.num_duplicates = 0
+        self.num_stale = 0
+        self.last_received = None
+
+        # Rate over the last complete window
+        self.rate = 0.0
+        self.window_start = None
+        self.window_messages = 0
+
+
+    def count(self, now):
+        self.num_messages += 1
+        self.last_received = now
+
+        if self.window_start is None:
+            # Messages after the window start are counted
+            self.window_start = now
+            self.window_messages = self.num_messages
+        elif now - self.window_start >= self.window:
+            self.rate = (self.num_messages - self.window_messages)/(now - self.window_start)
+            self.window_start = now
+            self.window_messages = self.num_messages
+
+
+    def stats(self, now):
+        return {
+            "messages": self.num_messages,
+            "merged": self.num_merged,
+            "duplicates": self.num_duplicates,
+            "stale": self.num_stale,
+            "rate": self.rate,
+            "seen": now - self.last_received if self.last_received is not None else None,
+        }
+
+
+class AircraftTable(object):
+    """
+    Latest state of every aircraft heard in the last `ttl` seconds, keyed by
+    ICAO address string. Aircraft are dicts as published by the decoder with
+    NaNs replaced by None and the time the update was received added.
+
+    Updates from several receivers are merged per aircraft. The freshest
+    report wins, and of two reports within the duplicate window the one with
+    the best SNR. A report that matches the aircraft's state within the
+    window is another receiver hearing the same frame and isn't passed on.
+    Each aircraft lists the receivers that heard it within the TTL.
+    """
+    def __init__(self, ttl=AIRCRAFT_TTL_S, snapshot_interval=SNAPSHOT_INTERVAL_S, duplicate_window=DUPLICATE_WINDOW_S):
+        self.ttl = ttl
+        self.snapshot_interval = snapshot_interval
+        self.duplicate_window = duplicate_window
+        self.aircraft = {}
+        self.num_messages = 0
+
+        # ICAO -> {receiver: time last heard}
+        self.receivers = {}
+        # Receiver -> SourceStats
+        self.sources = {}
+
+        # Aircraft with a position, indexed by location
+        self.grid = GridIndex()
+
+        # Cached /aircraft.json, as (time generated, body, gzipped body, ETag)
+        self.snapshot_cache = None
+
+
+    def update(self, plane, now=None, source=None):
+        """
+        Store an aircraft update from the receiver `source` and return the
+        stored aircraft, or None if it's a duplicate or stale report that
+        doesn't change it.
+        """
+        now = time.time() if now is None else now
+        plane = sanitize(plane)
+        plane["received"] = now
+        self.num_messages += 1
+
+        if source is not None:
+            plane = self.merge(plane, source, now)
+            if plane is None:
+                return None
+
+        self.aircraft[plane["icao"]] = plane
+        index_plane(self.grid, plane)
+        return plane
+
+
+    def merge(self, plane, source, now):
+        icao = plane["icao"]
+        stats = self.sources.get(source)
+        if stats is None:
+            stats = self.sources[source] = SourceStats()
+        stats.count(now)
+
+        receivers = self.receivers.setdefault(icao, {})
+        receivers[source] = now
+        stored = self.aircraft.get(icao)
+        if stored is None:
+            plane["source"] = source
+            plane["receivers"] = sorted(receivers)
+            return plane
+
+        receivers_changed = stored.get("receivers") != sorted(receivers)
+        age = stored.get("timestamp", 0.0) - plane.get("timestamp", 0.0)
+        if abs(age) <= self.duplicate_window and stored.get("source") != source \
+                and all(plane.get(name) is None or plane[name] == stored.get(name) for name in STATE_FIELDS):
+            # The same frame heard by another receiver
+            stats.num_duplicates += 1
+            if not receivers_changed and (plane.get("snr") or 0.0) <= (stored.get("snr") or 0.0):
+                return None
+            merged = dict(stored)
+            merged["snr"] = max(plane.get("snr") or 0.0, stored.get("snr") or 0.0)
+        elif age > self.duplicate_window or (age >= 0.0 and (plane.get("snr") or 0.0) < (stored.get("snr") or 0.0)):
+            # Older, or as fresh with a worse SNR, only fill in unknown fields
+            stats.num_stale += 1
+            missing = [name for name in STATE_FIELDS if stored.get(name) is None and plane.get(name) is not None]
+            if not missing and not receivers_changed:
+                return None
+            merged = dict(stored)
+            for name in missing:
+                merged[name] = plane[name]
+        else:
+            # Fresher, known fields override the stored state
+            if stored.get("source") != source:
+                stats.num_merged += 1
+            merged = dict(stored)
+            merged.update((key, value) for (key, value) in plane.items() if value is not None or key not in STATE_FIELDS)
+            merged["source"] = source
+
+        merged["received"] = now
+        merged["receivers"] = sorted(receivers)
+        return merged
+
+
+    def source_stats(self, now=None):
+        """
+        Message counters and rates per receiver.
+        """
+        now = time.time() if now is None else now
+        return {source: stats.stats(now) for (source, stats) in self.sources.items()}
+
+
+    def expire(self, now=None):
+        """
+        Remove aircraft not updated within the TTL and return their ICAO
+        addresses.
+        """
+        now = time.time() if now is None else now
+        expired = [icao for (icao, plane) in self.aircraft.items() if now - plane["received"] > self.ttl]
+        for icao in expired:
+            del self.aircraft[icao]
+            self.grid.remove(icao)
+            self.receivers.pop(icao, None)
+
+        # Receivers that stopped hearing an aircraft
+        for (icao, receivers) in self.receivers.items():
+            for source in [source for (source, received) in receivers.items() if now - received > self.ttl]:
+                del receivers[source]
+        return expired
+
+
+    def planes(self, viewport=None):
+        """
+        All aircraft, or the aircraft with a position inside the viewport.
+        """
+        if viewport is None:
+            return list(self.aircraft.values())
+        return self.grid.query(viewport)
+
+
+    def snapshot(self, now=None):
+        """
+        The aircraft.json snapshot as (body, gzipped body, ETag). It's
+        regenerated at most once per snapshot interval, however often it's
+        requested.
+        """
+        now = time.time() if now is None else now
+        if self.snapshot_cache is not None and now - self.snapshot_cache[0] < self.snapshot_interval:
+            return self.snapshot_cache[1:]
+
+        self.expire(now)
+        body = json.dumps({
+            "now": now,
+            "messages": self.num_messages,
+            "aircraft": [dump1090_aircraft(plane, now) for plane in self.aircraft.values()],
+        }).encode()
+        etag = hashlib.md5(body).hexdigest()
+
+        self.snapshot_cache = (now, body, gzip.compress(body), etag)
+        return self.snapshot_cache[1:]
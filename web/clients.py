@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Per-client outbound queues. Each browser gets the latest state of the
+aircraft updated since its last batch was acknowledged, so a slow client
+falls behind on its own instead of holding up the others.
+"""
+
+import collections
+import time
+
+MAX_IN_FLIGHT = 2 # Batches sent to a client and not yet acknowledged
+ACK_TIMEOUT_S = 10.0 # Seconds before an unacknowledged batch is given up on
+
+
+class ClientQueue(object):
+    """
+    Outbound aircraft updates for one client, keyed by ICAO. While
+    `max_in_flight` batches are waiting to be acknowledged, new updates are
+    merged into the pending ones, keeping the latest state per aircraft, so
+    the queue is bounded by the number of aircraft.
+    """
+    def __init__(self, max_in_flight=MAX_IN_FLIGHT, ack_timeout=ACK_TIMEOUT_S):
+        self.max_in_flight = max_in_flight
+        self.ack_timeout = ack_timeout
+
+        # ICAO -> serialized aircraft, in update order
+        self.pending = collections.OrderedDict()
+        # Time the oldest pending update was queued
+        self.pending_since = None
+        # Batch ID -> send time of the batches waiting to be acknowledged,
+        # in send order
+        self.in_flight = collections.OrderedDict()
+        self.next_batch_id = 0
+
+        # Metrics
+        self.num_queued = 0
+        self.num_merged = 0
+        self.num_sent = 0
+        self.num_batches = 0
+        self.num_acked = 0
+        self.num_timeouts = 0
+        self.ack_time = 0.0
+        self.max_ack_time = 0.0
+
+
+    def put(self, icao, data, now=None):
+        if icao in self.pending:
+            # Superseded before it was sent
+            self.num_merged += 1
+            del self.pending[icao]
+        elif not self.pending:
+            self.pending_since = time.time() if now is None else now
+        self.pending[icao] = data
+        self.num_queued += 1
+
+
+    def take(self, now=None):
+        """
+        The pending updates as a (batch ID, list) tuple, or None if there are
+        none or the client hasn't acknowledged enough of its earlier batches.
+        The batch is acknowledged with ack() and its ID.
+        """
+        now = time.time() if now is None else now
+
+        # Give up on batches whose acknowledgement was lost
+        while self.in_flight and now - next(iter(self.in_flight.values())) > self.ack_timeout:
+            self.in_flight.popitem(last=False)
+            self.num_timeouts += 1
+
+        if not self.pending or len(self.in_flight) >= self.max_in_flight:
+            return None
+
+        batch = list(self.pending.values())
+        self.pending.clear()
+        self.pending_since = None
+        batch_id = self.next_batch_id
+        self.next_batch_id += 1
+        self.in_flight[batch_id] = now
+        self.num_sent += len(batch)
+        self.num_batches += 1
+        return (batch_id, batch)
+
+
+    def ack(self, batch_id, now=None):
+        sent = self.in_flight.pop(batch_id, None)
+        if sent is None:
+            # Unknown, or arrived after the batch timed out
+            return
+        elapsed = (time.time() if now is None else now) - sent
+        self.num_acked += 1
+        self.ack_time += elapsed
+        self.max_ack_time = max(self.max_ack_time, elapsed)
+
+
+    def stats(self, now=None):
+        now = time.time() if now is None else now
+        return {
+            "pending": len(self.pending),
+            "in_flight": len(self.in_flight),
+            "lag": now - self.pending_since if self.pending_since is not None else 0.0,
+            "queued": self.num_queued,
+            "merged": self.num_merged,
+            "sent": self.num_sent,
+            "batches": self.num_batches,
+            "acked": self.num_acked,
+            "timeouts": self.num_timeouts,
+            "mean_ack_time": self.ack_time/self.num_acked if self.num_acked else 0.0,
+            "max_ack_time": self.max_ack_time,
+        }
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Load test of the webserver. It publishes synthetic aircraft updates the way
+the decoder's ZMQ Publish Address does, connects Socket.IO clients and
+reports the update rate the server sustains and the delivery latency.
+
+With --compare, it starts the gevent and the asyncio webserver in turn,
+configured to subscribe to the load test, and prints their results side by
+side:
+
+    $ python3 loadtest.py --compare --clients 20 --rate 5000 --duration 30
+
+Otherwise it tests the webserver already running at --url, which needs
+ZMQ_FORMAT = "json" and ZMQ_SOURCES pointing at the load test's ZMQ address
+in server.py, e.g. {"loadtest": "tcp://127.0.0.1:5001"}.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import aiohttp
+import socketio
+import zmq
+import zmq.asyncio
+
+PUBLISH_PERIOD_S = 0.01 # Seconds between bursts of published updates
+SERVER_START_TIMEOUT_S = 30 # Max seconds for a webserver started by --compare to answer
+
+# Webservers compared by --compare, as (name, script, code run first)
+SERVERS = [
+    ("gevent", "webserver.py", "from gevent import monkey; monkey.patch_all()"),
+    ("asyncio", "webserver_asyncio.py", ""),
+]
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(math.ceil(p/100.0*len(values))) - 1, len(values) - 1)]
+
+
+async def publish(address, rate, num_aircraft, stop):
+    # Updates are timestamped with the time they're published, so clients
+    # can measure the latency of the latest state of each aircraft
+    context = zmq.asyncio.Context.instance()
+    socket = context.socket(zmq.PUB)
+    socket.bind(address)
+    await asyncio.sleep(1.0)
+
+    num_published = 0
+    start = time.time()
+    while not stop.is_set():
+        due = int((time.time() - start)*rate)
+        while num_published < due:
+            ii = num_published % num_aircraft
+            plane = {
+                "icao": "{:06x}".format(0xa00000 + ii),
+                "df": 17,
+                "kind": "airborne_position",
+                "timestamp": time.time(),
+                "altitude": 30000 + num_published % 1000,
+                "latitude": 40.0 + (ii % 100)*0.05,
+                "longitude": -100.0 + (ii // 100)*0.05,
+                "snr": 20.0,
+            }
+            topic = "es/airborne_position/{}".format(plane["icao"])
+            await socket.send_multipart([topic.encode(), (json.dumps(plane) + "\n").encode()])
+            num_published += 1
+        await asyncio.sleep(PUBLISH_PERIOD_S)
+
+    socket.close(linger=0)
+    return num_published
+
+
+class Client(object):
+    def __init__(self):
+        self.sio = socketio.AsyncClient()
+        self.sio.on("updatePlanes", self.update_planes)
+        self.recording = False
+        self.num_updates = 0
+        self.latencies = []
+
+
+    async def update_planes(self, planes):
+        now = time.time()
+        if self.recording:
+            self.num_updates += len(planes)
+            self.latencies.extend(now - plane["timestamp"] for plane in planes)
+        # Acknowledge the batch, like the map does
+        return True
+
+
+async def source_messages(session, url):
+    async with session.get(url + "/sources.json") as response:
+        sources = await response.json()
+    return sum(source["messages"] for source in sources.values())
+
+
+async def run(args):
+    """
+    Load test the webserver at args.url and return the results.
+    """
+    clients = [Client() for _ in range(args.clients)]
+    for client in clients:
+        await client.sio.connect(args.url, transports=["websocket"])
+
+    stop = asyncio.Event()
+    publisher = asyncio.ensure_future(publish(args.zmq, args.rate, args.aircraft, stop))
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.sleep(args.warmup)
+        for client in clients:
+            client.recording = True
+        start = time.time()
+        start_messages = await source_messages(session, args.url)
+
+        await asyncio.sleep(args.duration)
+
+        elapsed = time.time() - start
+        num_messages = await source_messages(session, args.url) - start_messages
+        for client in clients:
+            client.recording = False
+
+    stop.set()
+    num_published = await publisher
+    for client in clients:
+        await client.sio.disconnect()
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    num_updates = sum(client.num_updates for client in clients)
+    return {
+        "published": num_published/(args.warmup + args.duration),
+        "ingest": num_messages/elapsed,
+        "delivered": num_updates/elapsed,
+        "p50": percentile(latencies, 50)*1e3,
+        "p99": percentile(latencies, 99)*1e3,
+        "max": max(latencies)*1e3 if latencies else float("nan"),
+    }
+
+
+async def wait_for_server(url, process):
+    start = time.time()
+    async with aiohttp.ClientSession() as session:
+        while time.time() - start < SERVER_START_TIMEOUT_S:
+            if process.poll() is not None:
+                raise RuntimeError("Webserver exited with code {}".format(process.returncode))
+            try:
+                async with session.get(url + "/sources.json") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("Webserver didn't start within {} s".format(SERVER_START_TIMEOUT_S))
+
+
+def start_server(script, prelude, args):
+    # Run the webserver with its configuration pointed at the load test
+    web_dir = os.path.dirname(os.path.abspath(__file__))
+    code = "\n".join([
+        prelude,
+        "import runpy, server",
+        "server.ZMQ_FORMAT = 'json'",
+        "server.ZMQ_SOURCES = {{'loadtest': {!r}}}".format(args.zmq.replace("*", "127.0.0.1")),
+        "server.WIRE_FORMAT = 'json'",
+        "runpy.run_path({!r}, run_name='__main__')".format(script),
+    ])
+    return subprocess.Popen([sys.executable, "-c", code], cwd=web_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def compare(args):
+    results = []
+    for (name, script, prelude) in SERVERS:
+        process = start_server(script, prelude, args)
+        try:
+            await wait_for_server(args.url, process)
+            results.append((name, await run(args)))
+        finally:
+            # Graceful shutdown, as with Ctrl+C
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+    return results
+
+
+def print_results(results, args):
+    print("{} clients, {} aircraft, {:.0f} updates/s published for {:.0f} s".format(args.clients, args.aircraft, args.rate, args.duration))
+    print("{:28s}".format("") + "".join("{:>12s}".format(name) for (name, _) in results))
+    rows = [
+        ("Server ingest (updates/s)", "ingest", "{:12.0f}"),
+        ("Delivered (updates/s)", "delivered", "{:12.0f}"),
+        ("Latency p50 (ms)", "p50", "{:12.1f}"),
+        ("Latency p99 (ms)", "p99", "{:12.1f}"),
+        ("Latency max (ms)", "max", "{:12.1f}"),
+    ]
+    for (label, key, fmt) in rows:
+        print("{:28s}".format(label) + "".join(fmt.format(result[key]) for (_, result) in results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the ADS-B webserver")
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="Webserver URL")
+    parser.add_argument("--zmq", default="tcp://127.0.0.1:5001", help="ZMQ address to publish updates on")
+    parser.add_argument("--clients", type=int, default=10, help="Number of Socket.IO clients")
+    parser.add_argument("--rate", type=float, default=2000, help="Published updates per second")
+    parser.add_argument("--aircraft", type=int, default=500, help="Number of aircraft")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds measured")
+    parser.add_argument("--warmup", type=float, default=3, help="Seconds before measuring")
+    parser.add_argument("--compare", action="store_true", help="Start and compare the gevent and asyncio webservers")
+    args = parser.parse_args()
+
+    if args.compare:
+        results = asyncio.run(compare(args))
+    else:
+        results = [("webserver", asyncio.run(run(args)))]
+    print_results(results, args)
+
+
+if __name__ == "__main__":
+    main()
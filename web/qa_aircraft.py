@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import gzip
+import json
+import unittest
+
+from aircraft import AircraftTable, GridIndex, SourceStats, Viewport
+
+class qa_aircraft(unittest.TestCase):
+
+    def test_001_snapshot(self):
+        table = AircraftTable(snapshot_interval=1.0)
+        table.update({"icao": "4840d6", "callsign": "KLM1023", "altitude": 35000, "heading": 0.0, "latitude": 52.0, "longitude": 4.5, "snr": float("nan")}, now=100.0)
+        (body, body_gzip, etag) = table.snapshot(now=100.5)
+        snapshot = json.loads(body)
+        self.assertEqual(snapshot["messages"], 1)
+        self.assertEqual(snapshot["aircraft"], [{"hex": "4840d6", "messages": 0, "seen": 0.5, "flight": "KLM1023", "alt_baro": 35000, "track": 90.0, "lat": 52.0, "lon": 4.5}])
+        self.assertEqual(gzip.decompress(body_gzip), body)
+
+        # Cached within the snapshot interval, however the aircraft change
+        table.update({"icao": "4840d6", "altitude": 36000}, now=101.0)
+        self.assertEqual(table.snapshot(now=101.0)[2], etag)
+        # and regenerated after it
+        self.assertNotEqual(table.snapshot(now=101.5)[2], etag)
+
+    def test_002_viewport_margin(self):
+        viewport = Viewport(50.0, 0.0, 52.0, 10.0, margin=0.1)
+        self.assertAlmostEqual(viewport.south, 49.8)
+        self.assertAlmostEqual(viewport.north, 52.2)
+        self.assertEqual(len(viewport.lon_ranges), 1)
+        self.assertAlmostEqual(viewport.lon_ranges[0][0], -1.0)
+        self.assertAlmostEqual(viewport.lon_ranges[0][1], 11.0)
+        self.assertTrue(viewport.contains(52.1, 10.5))
+        self.assertFalse(viewport.contains(52.3, 5.0))
+        self.assertFalse(viewport.contains(51.0, 11.5))
+
+        # Clamped at the poles
+        viewport = Viewport(80.0, 0.0, 89.0, 10.0)
+        self.assertEqual(viewport.north, 90.0)
+
+    def test_003_viewport_antimeridian(self):
+        # Leaflet's unwrapped bounds after panning east across the
+        # antimeridian
+        viewport = Viewport(-20.0, 170.0, -10.0, 190.0, margin=0.0)
+        self.assertEqual(viewport.lon_ranges, [(170.0, 180.0), (-180.0, -170.0)])
+        self.assertTrue(viewport.contains(-15.0, 175.0))
+        self.assertTrue(viewport.contains(-15.0, -175.0))
+        self.assertFalse(viewport.contains(-15.0, 0.0))
+
+        # The whole world when zoomed out past 360 degrees
+        viewport = Viewport(-60.0, -250.0, 60.0, 250.0)
+        self.assertEqual(viewport.lon_ranges, [(-180.0, 180.0)])
+
+    def test_004_grid_index(self):
+        grid = GridIndex(cell_deg=1.0)
+        grid.update("a", 52.5, 4.5, "a")
+        grid.update("b", 52.5, 4.7, "b")
+        grid.update("c", -15.0, 179.5, "c")
+        grid.update("d", -15.0, -179.5, "d")
+        self.assertEqual(len(grid), 4)
+        self.assertEqual(grid.cells[(52, 4)], {"a": (52.5, 4.5, "a"), "b": (52.5, 4.7, "b")})
+
+        viewport = Viewport(52.0, 4.0, 52.9, 4.6, margin=0.0)
+        self.assertEqual(viewport.cells(), [(52, 4)])
+        self.assertEqual(grid.query(viewport), ["a"])
+        viewport = Viewport(-20.0, 170.0, -10.0, 190.0, margin=0.0)
+        self.assertEqual(sorted(grid.query(viewport)), ["c", "d"])
+
+        # Moving to another cell leaves the old one
+        grid.update("a", 40.0, -74.0, "a")
+        self.assertEqual(list(grid.cells[(52, 4)]), ["b"])
+        self.assertEqual(grid.query(Viewport(39.0, -75.0, 41.0, -73.0)), ["a"])
+        grid.remove("b")
+        self.assertNotIn((52, 4), grid.cells)
+        grid.remove("b")
+        self.assertEqual(len(grid), 3)
+
+    def test_005_planes_in_viewport(self):
+        table = AircraftTable()
+        table.update({"icao": "a", "latitude": 52.5, "longitude": 4.5}, now=0.0)
+        table.update({"icao": "b", "latitude": None, "longitude": None}, now=0.0)
+        self.assertEqual(len(table.planes()), 2)
+        self.assertEqual([plane["icao"] for plane in table.planes(Viewport(52.0, 4.0, 53.0, 5.0))], ["a"])
+
+        # Losing its position removes an aircraft from the index
+        table.update({"icao": "a", "latitude": None, "longitude": None}, now=1.0)
+        self.assertEqual(table.planes(Viewport(52.0, 4.0, 53.0, 5.0)), [])
+
+    def test_006_duplicates(self):
+        table = AircraftTable(duplicate_window=0.5)
+        plane = {"icao": "a", "timestamp": 10.0, "altitude": 35000, "snr": 10.0}
+        self.assertEqual(table.update(dict(plane), now=0.0, source="north")["receivers"], ["north"])
+
+        # The same frame heard by another receiver only adds the receiver
+        merged = table.update(dict(plane, timestamp=10.2, snr=5.0), now=0.1, source="south")
+        self.assertEqual(merged["receivers"], ["north", "south"])
+        self.assertEqual(merged["source"], "north")
+        self.assertEqual(merged["snr"], 10.0)
+        # and isn't passed on again
+        self.assertIsNone(table.update(dict(plane, snr=5.0), now=0.2, source="south"))
+        # unless it has a better SNR
+        self.assertEqual(table.update(dict(plane, snr=20.0), now=0.3, source="south")["snr"], 20.0)
+        self.assertEqual(table.source_stats(now=0.3)["south"]["duplicates"], 3)
+
+    def test_007_newest_fields(self):
+        table = AircraftTable(duplicate_window=0.5)
+        table.update({"icao": "a", "timestamp": 10.0, "callsign": "KLM1023", "altitude": 35000}, now=0.0, source="north")
+
+        # A fresher report overrides the fields it knows
+        merged = table.update({"icao": "a", "timestamp": 11.0, "callsign": None, "altitude": 35100}, now=1.0, source="south")
+        self.assertEqual(merged["altitude"], 35100)
+        self.assertEqual(merged["callsign"], "KLM1023")
+        self.assertEqual(merged["source"], "south")
+        self.assertEqual(table.source_stats(now=1.0)["south"]["merged"], 1)
+
+        # An older report only fills in unknown fields
+        self.assertIsNone(table.update({"icao": "a", "timestamp": 9.0, "altitude": 35050}, now=1.1, source="north"))
+        merged = table.update({"icao": "a", "timestamp": 9.0, "altitude": 35050, "speed": 450.0}, now=1.2, source="north")
+        self.assertEqual(merged["altitude"], 35100)
+        self.assertEqual(merged["speed"], 450.0)
+        self.assertEqual(table.source_stats(now=1.2)["north"]["stale"], 2)
+
+    def test_008_expire(self):
+        table = AircraftTable(ttl=60)
+        table.update({"icao": "a", "timestamp": 0.0}, now=0.0, source="north")
+        table.update({"icao": "a", "timestamp": 0.1}, now=0.1, source="south")
+        table.update({"icao": "b", "timestamp": 0.0, "latitude": 52.5, "longitude": 4.5}, now=0.0, source="north")
+        table.update({"icao": "a", "timestamp": 50.0, "altitude": 1000}, now=50.0, source="south")
+
+        self.assertEqual(table.expire(now=61.0), ["b"])
+        self.assertEqual(sorted(table.aircraft), ["a"])
+        self.assertEqual(len(table.grid), 0)
+        # The receiver that stopped hearing the aircraft is dropped
+        self.assertEqual(table.receivers["a"], {"south": 50.0})
+        self.assertEqual(table.update({"icao": "a", "timestamp": 62.0}, now=62.0, source="south")["receivers"], ["south"])
+
+    def test_009_source_stats(self):
+        stats = SourceStats(window=10.0)
+        for ii in range(21):
+            stats.count(ii*0.5)
+        # The rate is measured once a window has passed
+        self.assertEqual(stats.stats(10.0)["rate"], 2.0)
+        self.assertEqual(stats.stats(12.0)["seen"], 2.0)
+        self.assertEqual(stats.stats(12.0)["messages"], 21)
+        for ii in range(5):
+            stats.count(12.0 + ii*2.0)
+        self.assertEqual(stats.stats(20.0)["rate"], 0.5)
+        self.assertIsNone(SourceStats().stats(0.0)["seen"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import unittest
+
+from clients import ClientQueue
+
+class qa_clients(unittest.TestCase):
+
+    def test_001_merge(self):
+        q = ClientQueue()
+        q.put("a", 1, now=0.0)
+        q.put("b", 2, now=1.0)
+        q.put("a", 3, now=2.0)
+        stats = q.stats(now=3.0)
+        self.assertEqual(stats["pending"], 2)
+        self.assertEqual(stats["merged"], 1)
+        self.assertEqual(stats["lag"], 3.0)
+        # The latest state of each aircraft, in update order
+        (batch_id, batch) = q.take(now=3.0)
+        self.assertEqual(batch, [2, 3])
+        self.assertEqual(q.stats(now=3.0)["lag"], 0.0)
+        self.assertIsNone(q.take(now=3.0))
+
+    def test_002_max_in_flight(self):
+        q = ClientQueue(max_in_flight=2)
+        ids = []
+        for ii in range(3):
+            q.put("a", ii, now=ii)
+            taken = q.take(now=ii)
+            if taken is not None:
+                ids.append(taken[0])
+        self.assertEqual(len(ids), 2)
+        self.assertEqual(q.stats(now=2.0)["pending"], 1)
+
+        # Acknowledging a batch lets the pending update through
+        q.ack(ids[0], now=2.5)
+        self.assertEqual(q.take(now=2.5)[1], [2])
+        stats = q.stats(now=2.5)
+        self.assertEqual(stats["acked"], 1)
+        self.assertEqual(stats["max_ack_time"], 2.5)
+        self.assertEqual(stats["in_flight"], 2)
+
+    def test_003_ack_timeout(self):
+        q = ClientQueue(max_in_flight=1, ack_timeout=10.0)
+        q.put("a", 1, now=0.0)
+        q.take(now=0.0)
+        q.put("a", 2, now=1.0)
+        self.assertIsNone(q.take(now=5.0))
+        # The lost acknowledgement is given up on
+        self.assertEqual(q.take(now=11.0)[1], [2])
+        self.assertEqual(q.stats(now=11.0)["timeouts"], 1)
+
+    def test_004_late_ack(self):
+        q = ClientQueue(max_in_flight=2, ack_timeout=10.0)
+        q.put("a", 1, now=0.0)
+        (old_id, batch) = q.take(now=0.0)
+        q.put("a", 2, now=8.0)
+        (new_id, batch) = q.take(now=8.0)
+        q.put("a", 3, now=11.0)
+        q.take(now=11.0)
+        self.assertEqual(q.stats(now=11.0)["timeouts"], 1)
+
+        # The timed out batch's acknowledgement doesn't count for the newer
+        # batches
+        q.ack(old_id, now=12.0)
+        stats = q.stats(now=12.0)
+        self.assertEqual(stats["acked"], 0)
+        self.assertEqual(stats["in_flight"], 2)
+
+        q.ack(new_id, now=12.0)
+        stats = q.stats(now=12.0)
+        self.assertEqual(stats["acked"], 1)
+        self.assertEqual(stats["in_flight"], 1)
+        self.assertEqual(stats["max_ack_time"], 4.0)
+
+        # Unknown and repeated IDs are ignored
+        q.ack(new_id, now=13.0)
+        q.ack(1000, now=13.0)
+        self.assertEqual(q.stats(now=13.0)["acked"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
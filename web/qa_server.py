@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+import gzip
+import json
+import unittest
+
+from server import AircraftHub
+
+class qa_server(unittest.TestCase):
+
+    def setUp(self):
+        self.hub = AircraftHub()
+        self.hub.aircraft_table.update({"icao": "4840d6", "altitude": 35000})
+
+    def test_001_aircraft_json(self):
+        (status, body, headers) = self.hub.aircraft_json()
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["aircraft"][0]["hex"], "4840d6")
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        # A quoted strong validator
+        self.assertTrue(headers["ETag"].startswith('"') and headers["ETag"].endswith('"'))
+
+    def test_002_etag(self):
+        (status, body, headers) = self.hub.aircraft_json()
+        (status, body, headers) = self.hub.aircraft_json(if_none_match='"other", ' + headers["ETag"])
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b"")
+        (status, body, headers) = self.hub.aircraft_json(if_none_match='"other"')
+        self.assertEqual(status, 200)
+
+    def test_003_gzip(self):
+        (status, body, headers) = self.hub.aircraft_json()
+        (status, body_gzip, headers_gzip) = self.hub.aircraft_json(accept_encoding="gzip, deflate, br")
+        self.assertEqual(status, 200)
+        self.assertEqual(headers_gzip["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(body_gzip), body)
+        # Both encodings are the same representation
+        self.assertEqual(headers_gzip["ETag"], headers["ETag"])
+
+    def receive(self, plane):
+        self.hub.receive([b"es/airborne_position/" + plane["icao"].encode(), json.dumps(plane).encode()], "local")
+
+    def test_004_tick(self):
+        self.hub.connect("all")
+        self.hub.connect("amsterdam")
+        self.hub.set_bounds("amsterdam", {"south": 52.0, "west": 4.0, "north": 53.0, "east": 5.0})
+        # New clients get the aircraft known before they connected
+        for sid in ["all", "amsterdam"]:
+            (batch_id, payload) = self.hub.take(sid)
+            self.assertEqual(payload[0]["icao"], "4840d6")
+            self.hub.acked(sid, batch_id)
+
+        # Updates between ticks are batched, with the latest state of each
+        # aircraft
+        self.receive({"icao": "4840d6", "altitude": 35100, "latitude": 52.5, "longitude": 4.5})
+        self.receive({"icao": "4840d6", "altitude": 35200, "latitude": 52.5, "longitude": 4.6})
+        self.receive({"icao": "a0b1c2", "altitude": 2000, "latitude": 40.0, "longitude": -74.0})
+        self.assertIsNone(self.hub.take("all"))
+        self.assertEqual(sorted(self.hub.tick()), ["all", "amsterdam"])
+
+        (batch_id, payload) = self.hub.take("all")
+        self.assertEqual([(plane["icao"], plane["altitude"]) for plane in payload], [("4840d6", 35200), ("a0b1c2", 2000)])
+        # Only the aircraft inside the client's viewport
+        (batch_id, payload) = self.hub.take("amsterdam")
+        self.assertEqual([plane["icao"] for plane in payload], ["4840d6"])
+
+        self.hub.acked("amsterdam", batch_id)
+        self.assertEqual(self.hub.clients()["amsterdam"]["acked"], 2)
+        self.hub.disconnect("amsterdam")
+        self.assertEqual(self.hub.tick(), ["all"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+Webserver configuration and the transport independent parts of serving
+aircraft to browsers: receiving decoder updates, batching them per tick into
+each client's queue and building /aircraft.json. webserver.py runs it on
+gevent and webserver_asyncio.py on asyncio.
+"""
+
+import importlib.util
+import json
+import os
+
+import zmq
+
+from aircraft import AircraftTable, GridIndex, Viewport, index_plane
+from clients import ClientQueue
+
+HTTP_ADDRESS ="127.0.0.1"
+HTTP_PORT = 5000
+
+ZMQ_SOURCES = {"local": "tcp://127.0.0.1:5002"} # Receiver name -> ZMQ address of its decoder, updates are merged per aircraft
+ZMQ_FORMAT = "json" # "json" or "binary" from the decoder's ZMQ Publish Address, "pmt" from a ZMQ PUB Message Sink (needs GNU Radio)
+ZMQ_TOPICS = [""] # Topic prefixes to subscribe to from the decoder's ZMQ Publish Address, e.g. "es/"
+
+WIRE_FORMAT = "json" # Aircraft updates sent to the browsers as "json" or compact "binary" records
+UPDATE_EVENT = "updatePlanesBinary" if WIRE_FORMAT == "binary" else "updatePlanes"
+
+UPDATE_TICK_S = 0.5 # Seconds between batched aircraft updates to the browsers
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+WIRE_MODULE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python", "adsb", "wire.py")
+
+
+def load_wire():
+    # The binary record format is loaded from the source tree rather than
+    # through the gnuradio.adsb package, whose __init__ needs GNU Radio. The
+    # webserver only needs GNU Radio for ZMQ_FORMAT = "pmt".
+    spec = importlib.util.spec_from_file_location("adsb_wire", WIRE_MODULE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+wire = load_wire()
+
+
+def serialize(plane, record=None):
+    # Binary records received from the decoder are forwarded as is. JSON
+    # batches are sent as lists of aircraft, Socket.IO encodes them once.
+    if WIRE_FORMAT == "binary":
+        return record if record is not None else wire.encode_plane(plane)
+    return plane
+
+
+def join(serialized):
+    if WIRE_FORMAT == "binary":
+        return b"".join(serialized)
+    return list(serialized)
+
+
+def subscribe(socket, address):
+    """
+    Subscribe a ZMQ SUB socket to a decoder.
+    """
+    if ZMQ_FORMAT == "pmt":
+        socket.setsockopt(zmq.SUBSCRIBE, b"")
+    else:
+        # The decoder publishes under "<family>/<kind>/<icao>" topics, ZMQ
+        # filters them before they are sent
+        for topic in ZMQ_TOPICS:
+            socket.setsockopt(zmq.SUBSCRIBE, topic.encode())
+    socket.connect(address)
+
+
+def decode_message(frames):
+    """
+    An aircraft update from the frames of a ZMQ message, as (plane, binary
+    record or None).
+    """
+    if ZMQ_FORMAT == "binary":
+        (topic, record) = frames
+        return (wire.decode_plane(record), record)
+    elif ZMQ_FORMAT == "json":
+        (topic, line) = frames
+        return (json.loads(line), None)
+    else:
+        import pmt
+        pdu = pmt.deserialize_str(frames[0])
+        return (pmt.to_python(pmt.car(pdu)), None)
+
+
+class AircraftHub(object):
+    """
+    Aircraft state and the connected clients. The transports feed it decoder
+    messages with receive(), call tick() every UPDATE_TICK_S and send each
+    client the batches take() returns, acknowledging them with acked().
+    """
+    def __init__(self):
+        # Latest state of every aircraft, sent as a snapshot to new clients
+        # and served as /aircraft.json
+        self.aircraft_table = AircraftTable()
+
+        # Latest state of each aircraft updated since the last tick, keyed
+        # by ICAO, with the binary record it arrived in if any
+        self.pending_planes = {}
+
+        # Map bounds of each connected client, keyed by session ID. None
+        # until the client sends its bounds, meaning it gets every aircraft.
+        self.viewports = {}
+
+        # Outbound updates of each connected client, keyed by session ID
+        self.client_queues = {}
+
+
+    def receive(self, frames, source):
+        (plane, record) = decode_message(frames)
+
+        # Fold the update into the aircraft's latest state, it's sent on the
+        # next tick. Duplicate and stale reports from other receivers don't
+        # change it.
+        plane = self.aircraft_table.update(plane, source=source)
+        if plane is None:
+            return
+        if len(ZMQ_SOURCES) > 1:
+            # The merged state no longer matches the received record
+            record = None
+        self.pending_planes[plane["icao"]] = (plane, record)
+
+
+    def tick(self):
+        """
+        Queue the updates since the last tick for each client and return the
+        clients to send to.
+        """
+        self.aircraft_table.expire()
+        (planes, self.pending_planes) = (self.pending_planes, {})
+
+        # Serialize each aircraft once (a binary record, JSON is left to
+        # Socket.IO) and index it by location. Clients get
+        # the aircraft inside their viewport, clients without a viewport get
+        # the whole batch.
+        grid = GridIndex()
+        serialized = []
+        for (plane, record) in planes.values():
+            item = (plane["icao"], serialize(plane, record))
+            serialized.append(item)
+            index_plane(grid, plane, item)
+
+        # Emitting never waits on a slow client, its updates are merged until
+        # it catches up
+        sids = []
+        for (sid, viewport) in list(self.viewports.items()):
+            queue = self.client_queues.get(sid)
+            if queue is None:
+                continue
+            for (icao, data) in (serialized if viewport is None else grid.query(viewport)):
+                queue.put(icao, data)
+            sids.append(sid)
+        return sids
+
+
+    def take(self, sid):
+        """
+        The client's next batch as a (batch ID, payload) tuple, or None if
+        there's nothing to send or it's still behind on acknowledging earlier
+        batches. The browser acknowledges each batch once it has drawn it.
+        """
+        queue = self.client_queues.get(sid)
+        if queue is None:
+            return None
+        taken = queue.take()
+        if taken is None:
+            return None
+        (batch_id, batch) = taken
+        return (batch_id, join(batch))
+
+
+    def acked(self, sid, batch_id):
+        queue = self.client_queues.get(sid)
+        if queue is not None:
+            queue.ack(batch_id)
+
+
+    def connect(self, sid):
+        print("Client connected", sid)
+        self.viewports[sid] = None
+        self.client_queues[sid] = ClientQueue()
+
+        # Queue every known aircraft for the new client
+        self.queue_planes(sid, self.aircraft_table.planes())
+
+
+    def set_bounds(self, sid, bounds):
+        viewport = Viewport(bounds["south"], bounds["west"], bounds["north"], bounds["east"])
+        self.viewports[sid] = viewport
+
+        # Queue the aircraft already inside the new viewport
+        self.queue_planes(sid, self.aircraft_table.planes(viewport))
+
+
+    def disconnect(self, sid):
+        print("Client disconnected", sid)
+        self.viewports.pop(sid, None)
+        self.client_queues.pop(sid, None)
+
+
+    def queue_planes(self, sid, planes):
+        queue = self.client_queues.get(sid)
+        if queue is not None:
+            for plane in planes:
+                queue.put(plane["icao"], serialize(plane))
+
+
+    def aircraft_json(self, if_none_match="", accept_encoding=""):
+        """
+        The /aircraft.json response as (status, body, headers), given the
+        request's If-None-Match and Accept-Encoding headers.
+        """
+        (body, body_gzip, etag) = self.aircraft_table.snapshot()
+        etag = '"{}"'.format(etag)
+
+        headers = {
+            "ETag": etag,
+            "Vary": "Accept-Encoding",
+            "Content-Type": "application/json",
+            "Cache-Control": "no-cache",
+        }
+        if etag in if_none_match:
+            return (304, b"", headers)
+        if "gzip" in accept_encoding:
+            headers["Content-Encoding"] = "gzip"
+            return (200, body_gzip, headers)
+        return (200, body, headers)
+
+
+    def sources(self):
+        # Message, merge, duplicate and stale counters and message rate per
+        # receiver
+        return self.aircraft_table.source_stats()
+
+
+    def clients(self):
+        # Lag, merge (dropped update) and acknowledgement counters per client
+        return {sid: queue.stats() for (sid, queue) in list(self.client_queues.items())}
@@ -0,0 +1,228 @@
+//
+// Copyright 2016-2019 Matt Hostetter.
+//
+// This is free software; you can redistribute it and/or modify
+// it under the terms of the GNU General Public License as published by
+// the Free Software Foundation; either version 3, or (at your option)
+// any later version.
+//
+// This software is distributed in the hope that it will be useful,
+// but WITHOUT ANY WARRANTY; without even the implied warranty of
+// MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+// GNU General Public License for more details.
+//
+// You should have received a copy of the GNU General Public License
+// along with this software; see the file COPYING.  If not, write to
+// the Free Software Foundation, Inc., 51 Franklin Street,
+// Boston, MA 02110-1301, USA.
+//
+
+// Canvas layer drawing every aircraft's rotated icon and track in one pass
+// per animation frame, instead of a DOM marker and polylines per aircraft.
+//
+// `aircraft` is an object of entries keyed by ICAO, each with:
+//   plane      the latest aircraft update
+//   latlng     its location
+//   rotation   icon rotation, in degrees clockwise
+//   track      track segments, each {color: ..., latlngs: [...]}
+//
+// Call redraw() after changing the entries. Tooltips and popups are found by
+// hit-testing the drawn icons, and their HTML is only built when they're
+// shown.
+
+L.AircraftLayer = L.Layer.extend({
+  options: {
+    iconUrl: './img/airliner.png',
+    iconSize: 20,
+    hitTolerance: 4,
+    trackWeight: 3,
+    formatTooltip: function(plane) { return plane.icao; },
+    formatPopup: function(plane) { return plane.icao; }
+  },
+
+  initialize: function(aircraft, options) {
+    L.setOptions(this, options);
+    this._aircraft = aircraft;
+    this._frame = null;
+    // Screen positions of the icons drawn in the last frame, for hit-testing
+    this._drawn = [];
+    this._popup = null;
+    this._popupIcao = null;
+    this._tooltip = null;
+    this._tooltipIcao = null;
+
+    this._icon = new Image();
+    this._icon.onload = L.bind(this.redraw, this);
+    this._icon.src = this.options.iconUrl;
+  },
+
+  onAdd: function(map) {
+    this._canvas = L.DomUtil.create('canvas', 'leaflet-zoom-hide');
+    this._canvas.style.pointerEvents = 'none';
+    map.getPanes().overlayPane.appendChild(this._canvas);
+
+    map.on('moveend resize', this._reset, this);
+    map.on('click', this._onClick, this);
+    map.on('mousemove', this._onMouseMove, this);
+    map.on('popupclose', this._onPopupClose, this);
+    this._reset();
+  },
+
+  onRemove: function(map) {
+    L.DomUtil.remove(this._canvas);
+    map.off('moveend resize', this._reset, this);
+    map.off('click', this._onClick, this);
+    map.off('mousemove', this._onMouseMove, this);
+    map.off('popupclose', this._onPopupClose, this);
+    if (this._frame) {
+      L.Util.cancelAnimFrame(this._frame);
+      this._frame = null;
+    }
+  },
+
+  // Draws on the next animation frame, however many times it's called before
+  redraw: function() {
+    if (this._map && !this._frame) {
+      this._frame = L.Util.requestAnimFrame(this._draw, this);
+    }
+    return this;
+  },
+
+  _reset: function() {
+    // The canvas covers the map's container
+    var size = this._map.getSize();
+    var ratio = window.devicePixelRatio || 1;
+    L.DomUtil.setPosition(this._canvas, this._map.containerPointToLayerPoint([0, 0]));
+    this._canvas.width = size.x * ratio;
+    this._canvas.height = size.y * ratio;
+    this._canvas.style.width = size.x + 'px';
+    this._canvas.style.height = size.y + 'px';
+    this.redraw();
+  },
+
+  _draw: function() {
+    this._frame = null;
+    var map = this._map;
+    var ctx = this._canvas.getContext('2d');
+    var ratio = window.devicePixelRatio || 1;
+    var size = map.getSize();
+    var half = this.options.iconSize / 2;
+    var bounds = L.bounds([-half, -half], [size.x + half, size.y + half]);
+
+    ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+    ctx.clearRect(0, 0, size.x, size.y);
+
+    // Tracks first, so the icons are drawn over them
+    ctx.lineWidth = this.options.trackWeight;
+    ctx.lineJoin = 'round';
+    for (var icao in this._aircraft) {
+      var track = this._aircraft[icao].track;
+      for (var i = 0; i < track.length; i++) {
+        var latlngs = track[i].latlngs;
+        ctx.beginPath();
+        ctx.strokeStyle = track[i].color;
+        for (var j = 0; j < latlngs.length; j++) {
+          var point = map.latLngToContainerPoint(latlngs[j]);
+          if (j == 0) {
+            ctx.moveTo(point.x, point.y);
+          }
+          else {
+            ctx.lineTo(point.x, point.y);
+          }
+        }
+        ctx.stroke();
+      }
+    }
+
+    this._drawn = [];
+    var iconLoaded = this._icon.complete && this._icon.naturalWidth > 0;
+    for (var icao in this._aircraft) {
+      var entry = this._aircraft[icao];
+      var point = map.latLngToContainerPoint(entry.latlng);
+      if (!bounds.contains(point)) {
+        continue;
+      }
+      this._drawn.push({icao: icao, x: point.x, y: point.y});
+      if (iconLoaded) {
+        ctx.save();
+        ctx.translate(point.x, point.y);
+        ctx.rotate(entry.rotation * Math.PI / 180);
+        ctx.drawImage(this._icon, -half, -half, 2 * half, 2 * half);
+        ctx.restore();
+      }
+    }
+
+    // Only the open popup follows its aircraft
+    if (this._popupIcao != null) {
+      var entry = this._aircraft[this._popupIcao];
+      if (entry == undefined) {
+        map.closePopup(this._popup);
+      }
+      else {
+        this._popup.setLatLng(entry.latlng).setContent(this.options.formatPopup(entry.plane));
+      }
+    }
+  },
+
+  // The aircraft whose icon is under a container point, nearest first
+  _hitTest: function(containerPoint) {
+    var radius = this.options.iconSize / 2 + this.options.hitTolerance;
+    var best = null;
+    var bestDistance = radius * radius;
+    for (var i = 0; i < this._drawn.length; i++) {
+      var dx = this._drawn[i].x - containerPoint.x;
+      var dy = this._drawn[i].y - containerPoint.y;
+      var distance = dx * dx + dy * dy;
+      if (distance <= bestDistance) {
+        best = this._drawn[i].icao;
+        bestDistance = distance;
+      }
+    }
+    return best;
+  },
+
+  _onClick: function(e) {
+    var icao = this._hitTest(e.containerPoint);
+    if (icao == null) {
+      return;
+    }
+    var entry = this._aircraft[icao];
+    this._popup = L.popup({offset: [0, -this.options.iconSize / 2]})
+      .setLatLng(entry.latlng)
+      .setContent(this.options.formatPopup(entry.plane))
+      .openOn(this._map);
+    this._popupIcao = icao;
+  },
+
+  _onPopupClose: function(e) {
+    if (e.popup === this._popup) {
+      this._popup = null;
+      this._popupIcao = null;
+    }
+  },
+
+  _onMouseMove: function(e) {
+    var icao = this._hitTest(e.containerPoint);
+    this._map.getContainer().style.cursor = icao == null ? '' : 'pointer';
+    if (icao == this._tooltipIcao) {
+      return;
+    }
+
+    if (this._tooltip) {
+      this._map.closeTooltip(this._tooltip);
+      this._tooltip = null;
+    }
+    this._tooltipIcao = icao;
+    if (icao != null) {
+      var entry = this._aircraft[icao];
+      this._tooltip = L.tooltip({direction: 'top', offset: [0, -this.options.iconSize / 2]})
+        .setLatLng(entry.latlng)
+        .setContent(this.options.formatTooltip(entry.plane));
+      this._map.openTooltip(this._tooltip);
+    }
+  }
+});
+
+L.aircraftLayer = function(aircraft, options) {
+  return new L.AircraftLayer(aircraft, options);
+};
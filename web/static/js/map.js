@@ -19,22 +19,48 @@
 
 var planes = {};
 
+// Tracks are thinned: a point is only kept if it's far enough from the
+// previous one and the track turns there
+var TRACK_MIN_DISTANCE_M = 250;
+var TRACK_MIN_TURN_DEG = 2;
+var TRACK_MAX_POINTS = 500; // Points kept per aircraft track
+
+var PLANE_TIMEOUT_S = 120; // Seconds an aircraft stays on the map after its last update
+var PLANE_SWEEP_S = 10; // Seconds between removals of timed out aircraft
+
 // Create SocketIO instance
 var socket = io('http://localhost:5000');
 
 socket.on('connect', function() {
   console.log('Client has connected via SocketIO.');
+  sendBounds();
 });
 socket.on('disconnect', function() {
   console.log('Client disconnected via SocketIO.');
 });
-socket.on('updatePlane', function(plane) {
-  updatePlane(map, plane);
+socket.on('updatePlanes', function(planes, ack) {
+  // The latest state of every aircraft updated since the last batch. The
+  // acknowledgement lets the server send the next one.
+  updatePlanes(map, planes);
+  if (ack) {
+    ack();
+  }
+});
+socket.on('updatePlanesBinary', function(buffer, ack) {
+  // The same, as binary records
+  updatePlanes(map, decodePlaneRecords(buffer));
+  if (ack) {
+    ack();
+  }
 });
 
 // Create the leaflet map
 var map = L.map('map');
 
+// The server only sends the aircraft inside the map bounds, once it knows
+// them
+map.on('moveend', sendBounds);
+
 // Attempt to locate user. Map will also center to first plane, once received.
 map.locate({setView: true});
 
@@ -103,10 +129,13 @@ var colormapRainbow = [
 ];
 colormap = colormapRainbow;
 
-var planeIcon = L.icon({
+// Every aircraft's icon and track is drawn on one canvas
+var aircraftLayer = L.aircraftLayer(planes, {
   iconUrl: './img/airliner.png',
-  iconSize:     [20, 20],
-});
+  iconSize: 20,
+  formatTooltip: formatTooltip,
+  formatPopup: formatPopup
+}).addTo(map);
 
 // // Adjust marker size based on zoom level
 // var planeSize = [50, 50, 50, 50, 50, 50, 50, 40, 30, 20, 10, 10, 10, 10, 10, 10, 10, 10];
@@ -118,7 +147,105 @@ var planeIcon = L.icon({
 // });
 
 
+function sendBounds() {
+  if (!map._loaded) {
+    // The map has no view yet, the server sends every aircraft until it does.
+    // Leaflet marks the map loaded before the first 'moveend', but only fires
+    // 'load' after it.
+    return;
+  }
+  var bounds = map.getBounds();
+  socket.emit('setBounds', {
+    south: bounds.getSouth(),
+    west: bounds.getWest(),
+    north: bounds.getNorth(),
+    east: bounds.getEast()
+  });
+}
+
+
+// Binary aircraft update records, see python/adsb/wire.py for the layout
+var RECORD_SIZE = 48;
+var FLAG_CALLSIGN = 0x01;
+var FLAG_ALTITUDE = 0x02;
+var FLAG_VELOCITY = 0x04;
+var FLAG_VERTICAL_RATE = 0x08;
+var FLAG_POSITION = 0x10;
+var FLAG_SNR = 0x20;
+
+function decodePlaneRecords(buffer) {
+  var view = new DataView(buffer);
+  var batch = [];
+  for (var offset = 0; offset + RECORD_SIZE <= buffer.byteLength; offset += RECORD_SIZE) {
+    batch.push(decodePlaneRecord(view, offset));
+  }
+  return batch;
+}
+
+
+function decodePlaneRecord(view, offset) {
+  var flags = view.getUint8(offset + 1);
+  var plane = {
+    df: view.getUint8(offset + 2),
+    icao: ('00000' + view.getUint32(offset + 4, true).toString(16)).slice(-6),
+    timestamp: view.getFloat64(offset + 8, true),
+    latitude: null,
+    longitude: null,
+    altitude: null,
+    speed: null,
+    heading: null,
+    vertical_rate: null,
+    snr: null,
+    num_msgs: view.getUint32(offset + 36, true),
+    callsign: null
+  };
+  if (flags & FLAG_POSITION) {
+    plane.latitude = view.getInt32(offset + 16, true) / 1e6;
+    plane.longitude = view.getInt32(offset + 20, true) / 1e6;
+  }
+  if (flags & FLAG_ALTITUDE) {
+    plane.altitude = view.getInt16(offset + 24, true) * 25;
+  }
+  if (flags & FLAG_VELOCITY) {
+    plane.speed = view.getUint16(offset + 26, true) / 10;
+    plane.heading = view.getInt16(offset + 28, true) / 100;
+  }
+  if (flags & FLAG_VERTICAL_RATE) {
+    plane.vertical_rate = view.getInt16(offset + 30, true);
+  }
+  if (flags & FLAG_SNR) {
+    plane.snr = view.getInt16(offset + 32, true) / 100;
+  }
+  if (flags & FLAG_CALLSIGN) {
+    plane.callsign = '';
+    for (var i = 0; i < 8; i++) {
+      var c = view.getUint8(offset + 40 + i);
+      if (c != 0) {
+        plane.callsign += String.fromCharCode(c);
+      }
+    }
+  }
+  return plane;
+}
+
+
+function updatePlanes(map, batch) {
+  for (var i = 0; i < batch.length; i++) {
+    updatePlane(map, batch[i]);
+  }
+  aircraftLayer.redraw();
+}
+
+
 function updatePlane(map, plane) {
+  if (plane.latitude == null || plane.longitude == null) {
+    // No position yet
+    return;
+  }
+  if (plane.datetime == undefined) {
+    plane.datetime = new Date(plane.timestamp * 1000).toISOString();
+  }
+
   if (planes[plane.icao] == undefined) {
     addPlane(map, plane);
   }
@@ -129,38 +256,107 @@ function updatePlane(map, plane) {
 
 
 function addPlane(map, plane) {
-  latlng = [plane.latitude, plane.longitude];
+  latlng = L.latLng(plane.latitude, plane.longitude);
   // Set initial view of map on first plane reception
   if (Object.keys(planes).length == 0) {
     map.setView(latlng, 9);
   }
+  // Drawn by the aircraft layer, the tooltip and popup are only formatted
+  // from the plane when they're shown
   planes[plane.icao] = {};
-  planes[plane.icao]['marker'] = L.marker(latlng, {
-    icon: planeIcon,
-    rotationAngle: headingToRotationAngle(plane.heading),
-    rotationOrigin: 'center center'
-  }).addTo(map);
-  planes[plane.icao]['tooltip'] = L.tooltip(formatTooltip(plane));
-  planes[plane.icao]['popup'] = L.popup(formatPopup(plane));
-  planes[plane.icao]['marker'].bindTooltip(planes[plane.icao]['tooltip']);
-  planes[plane.icao]['marker'].bindPopup(planes[plane.icao]['popup']);
-  planes[plane.icao]['track'] = L.layerGroup();
+  planes[plane.icao]['plane'] = plane;
+  planes[plane.icao]['latlng'] = latlng;
+  planes[plane.icao]['rotation'] = headingToRotationAngle(plane.heading);
+  // One segment per altitude color, oldest first
+  planes[plane.icao]['track'] = [];
+  planes[plane.icao]['num_points'] = 0;
   planes[plane.icao]['last_location'] = latlng;
+  planes[plane.icao]['last_update'] = Date.now();
 }
 
 
 function movePlane(map, plane) {
-  latlng = [plane.latitude, plane.longitude];
-  planes[plane.icao]['marker'].setLatLng(latlng);
-  planes[plane.icao]['marker'].setRotationAngle(headingToRotationAngle(plane.heading));
-  planes[plane.icao]['tooltip'].setContent(formatTooltip(plane));
-  planes[plane.icao]['popup'].setContent(formatPopup(plane));
-  prev_latlng = planes[plane.icao]['last_location']
-  planes[plane.icao]['track'].addLayer(L.polyline([prev_latlng, latlng], {color: altitudeColor(plane.altitude)}).addTo(map));
+  latlng = L.latLng(plane.latitude, plane.longitude);
+  planes[plane.icao]['plane'] = plane;
+  planes[plane.icao]['latlng'] = latlng;
+  planes[plane.icao]['rotation'] = headingToRotationAngle(plane.heading);
+  extendTrack(map, planes[plane.icao], latlng, altitudeColor(plane.altitude));
   planes[plane.icao]['last_location'] = latlng;
+  planes[plane.icao]['last_update'] = Date.now();
+}
+
+
+function extendTrack(map, entry, latlng, color) {
+  var track = entry['track'];
+  var segment = track[track.length - 1];
+
+  if (segment == undefined || segment.color != color) {
+    // Start a new segment at the aircraft's last location when the
+    // altitude color changes
+    segment = {color: color, latlngs: [entry['last_location'], latlng]};
+    track.push(segment);
+    entry['num_points'] += 2;
+  }
+  else {
+    var latlngs = segment.latlngs;
+    var n = latlngs.length;
+    if (isRedundantPoint(map, latlngs[n - 2], latlngs[n - 1], latlng)) {
+      // The track's head just moves to the new location
+      latlngs[n - 1] = latlng;
+    }
+    else {
+      latlngs.push(latlng);
+      entry['num_points'] += 1;
+    }
+  }
+
+  // Drop the oldest points beyond the track's length
+  while (entry['num_points'] > TRACK_MAX_POINTS) {
+    var oldest = track[0];
+    if (oldest.latlngs.length > 2) {
+      oldest.latlngs.shift();
+      entry['num_points'] -= 1;
+    }
+    else {
+      track.shift();
+      entry['num_points'] -= oldest.latlngs.length;
+    }
+  }
 }
 
 
+// The middle of three track points is redundant if it's close to the
+// previous point or the track hardly turns there
+function isRedundantPoint(map, previous, middle, latlng) {
+  if (map.distance(previous, middle) < TRACK_MIN_DISTANCE_M) {
+    return true;
+  }
+  var turn = Math.abs(bearing(previous, middle) - bearing(middle, latlng));
+  turn = Math.min(turn, 360 - turn);
+  return turn < TRACK_MIN_TURN_DEG;
+}
+
+
+// Bearing in degrees, good enough over the short distances between points
+function bearing(from, to) {
+  var dx = (to.lng - from.lng) * Math.cos(from.lat * Math.PI / 180);
+  var dy = to.lat - from.lat;
+  return Math.atan2(dx, dy) * 180 / Math.PI;
+}
+
+
+// Remove the aircraft that haven't been heard for a while, with their tracks
+setInterval(function() {
+  var now = Date.now();
+  for (var icao in planes) {
+    if (now - planes[icao]['last_update'] > PLANE_TIMEOUT_S * 1000) {
+      delete planes[icao];
+    }
+  }
+  aircraftLayer.redraw();
+}, PLANE_SWEEP_S * 1000);
+
+
 function formatTooltip(plane) {
   return plane.icao + ': ' + plane.callsign;
 }
@@ -173,16 +369,28 @@ function formatPopup(plane) {
   str += '<tr><td><b>Datetime</b></td><td>' + plane.datetime + '</td></tr>';
   str += '<tr><td><b>Altitude</b></td><td>' + plane.altitude + ' ft</td></tr>';
   str += '<tr><td><b>Vertical Rate</b></td><td>' + plane.vertical_rate + ' ft/min</td></tr>';
-  str += '<tr><td><b>Speed</b></td><td>' + plane.speed.toFixed(0) + ' kt</td></tr>';
-  str += '<tr><td><b>Heading</b></td><td>' + plane.heading.toFixed(0) + ' deg</td></tr>';
-  str += '<tr><td><b>Latitude</b></td><td>' + plane.latitude.toFixed(8) + '</td></tr>';
-  str += '<tr><td><b>Longitude</b></td><td>' + plane.longitude.toFixed(8) + '</td></tr>';
+  str += '<tr><td><b>Speed</b></td><td>' + formatNumber(plane.speed, 0) + ' kt</td></tr>';
+  str += '<tr><td><b>Heading</b></td><td>' + formatNumber(plane.heading, 0) + ' deg</td></tr>';
+  str += '<tr><td><b>Latitude</b></td><td>' + formatNumber(plane.latitude, 8) + '</td></tr>';
+  str += '<tr><td><b>Longitude</b></td><td>' + formatNumber(plane.longitude, 8) + '</td></tr>';
+  if (plane.receivers) {
+    str += '<tr><td><b>Receivers</b></td><td>' + plane.receivers.join(', ') + '</td></tr>';
+  }
   str += "</table>"
 
   return str;
 }
 
 
+// Unknown values are null
+function formatNumber(value, digits) {
+  if (value == null) {
+    return '-';
+  }
+  return value.toFixed(digits);
+}
+
+
 function headingToRotationAngle(heading) {
   return -heading;
 }
@@ -22,39 +22,52 @@
 from gevent import monkey
 monkey.patch_all()
 
-import time
-from flask import Flask, request
+from flask import Flask, jsonify, make_response, request
 from flask_socketio import SocketIO
 from threading import Thread
 import zmq.green as zmq
 
-import pmt
-
-HTTP_ADDRESS ="127.0.0.1"
-HTTP_PORT = 5000
-
-ZMQ_ADDRESS = "127.0.0.1"
-ZMQ_PORT = 5001
+import server
+from server import AircraftHub
 
 app = Flask(__name__, static_url_path="")
 app.config["SECRET_KEY"] = "secret!"
 socketio = SocketIO(app)
 
+hub = AircraftHub()
+
 
-def zmq_thread():
+def zmq_thread(source, address):
     # Establish ZMQ context and socket
-    context = zmq.Context()
+    context = zmq.Context.instance()
     socket = context.socket(zmq.SUB)
-    socket.setsockopt(zmq.SUBSCRIBE, b"")
-    socket.connect("tcp://{:s}:{:d}".format(ZMQ_ADDRESS, ZMQ_PORT))
+    server.subscribe(socket, address)
 
     while True:
         # Receive decoded ADS-B message from the decoder over ZMQ
-        pdu_bin = socket.recv()
-        pdu = pmt.deserialize_str(pdu_bin)
-        plane = pmt.to_python(pmt.car(pdu))
+        hub.receive(socket.recv_multipart(), source)
+
+
+def send(sid):
+    taken = hub.take(sid)
+    if taken is not None:
+        # The acknowledgement is matched to the batch by its ID, so a late one
+        # can't be taken for a newer batch's
+        (batch_id, payload) = taken
+        socketio.emit(server.UPDATE_EVENT, payload, room=sid, callback=lambda *args: acked(sid, batch_id))
 
-        socketio.emit("updatePlane", plane)
+
+def acked(sid, batch_id):
+    # The client has drawn the batch, send the updates merged in the meantime
+    hub.acked(sid, batch_id)
+    send(sid)
+
+
+def broadcast_thread():
+    while True:
+        socketio.sleep(server.UPDATE_TICK_S)
+        for sid in hub.tick():
+            send(sid)
 
 
 @app.route("/")
@@ -62,19 +75,45 @@ def index():
     return app.send_static_file("index.html")
 
 
+@app.route("/aircraft.json")
+def aircraft_json():
+    (status, body, headers) = hub.aircraft_json(request.headers.get("If-None-Match", ""), request.headers.get("Accept-Encoding", ""))
+    return make_response(body, status, headers)
+
+
+@app.route("/sources.json")
+def sources_json():
+    return jsonify(hub.sources())
+
+
+@app.route("/clients.json")
+def clients_json():
+    return jsonify(hub.clients())
+
+
 @socketio.on("connect")
 def connect():
-    print("Client connected", request.sid)
+    hub.connect(request.sid)
+    send(request.sid)
+
+
+@socketio.on("setBounds")
+def set_bounds(bounds):
+    hub.set_bounds(request.sid, bounds)
+    send(request.sid)
 
 
 @socketio.on("disconnect")
 def disconnect():
-    print("Client disconnected", request.sid)
+    hub.disconnect(request.sid)
 
 
 if __name__ == "__main__":
-    thread = Thread(target=zmq_thread)
-    thread.daemon = True
-    thread.start()
+    for (source, address) in server.ZMQ_SOURCES.items():
+        thread = Thread(target=zmq_thread, args=(source, address))
+        thread.daemon = True
+        thread.start()
+
+    socketio.start_background_task(broadcast_thread)
 
-    socketio.run(app, host=HTTP_ADDRESS, port=HTTP_PORT, debug=True, use_reloader=False)
+    socketio.run(app, host=server.HTTP_ADDRESS, port=server.HTTP_PORT, debug=True, use_reloader=False)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2016-2019 Matt Hostetter.
+#
+# This is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3, or (at your option)
+# any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this software; see the file COPYING.  If not, write to
+# the Free Software Foundation, Inc., 51 Franklin Street,
+# Boston, MA 02110-1301, USA.
+#
+
+"""
+The webserver on asyncio, with aiohttp, python-socketio and zmq.asyncio
+instead of gevent monkey patching. It serves the same routes and Socket.IO
+events as webserver.py, configured in server.py.
+"""
+
+import asyncio
+import os
+import socketio
+import zmq.asyncio
+from aiohttp import web
+
+import server
+from server import AircraftHub
+
+sio = socketio.AsyncServer(async_mode="aiohttp")
+app = web.Application()
+sio.attach(app)
+
+hub = AircraftHub()
+
+
+async def zmq_task(context, source, address):
+    socket = context.socket(zmq.SUB)
+    server.subscribe(socket, address)
+    try:
+        while True:
+            # Receive decoded ADS-B message from the decoder over ZMQ
+            hub.receive(await socket.recv_multipart(), source)
+    finally:
+        socket.close(linger=0)
+
+
+async def send(sid):
+    taken = hub.take(sid)
+    if taken is not None:
+        # The acknowledgement is matched to the batch by its ID, so a late one
+        # can't be taken for a newer batch's
+        (batch_id, payload) = taken
+        await sio.emit(server.UPDATE_EVENT, payload, to=sid, callback=lambda *args: acked(sid, batch_id))
+
+
+async def acked(sid, batch_id):
+    # The client has drawn the batch, send the updates merged in the meantime
+    hub.acked(sid, batch_id)
+    await send(sid)
+
+
+async def broadcast_task():
+    while True:
+        await asyncio.sleep(server.UPDATE_TICK_S)
+        # Send to all clients concurrently
+        sends = [send(sid) for sid in hub.tick()]
+        if sends:
+            await asyncio.gather(*sends)
+
+
+async def index(request):
+    return web.FileResponse(os.path.join(server.STATIC_DIR, "index.html"))
+
+
+async def aircraft_json(request):
+    (status, body, headers) = hub.aircraft_json(request.headers.get("If-None-Match", ""), request.headers.get("Accept-Encoding", ""))
+    return web.Response(status=status, body=body, headers=headers)
+
+
+async def sources_json(request):
+    return web.json_response(hub.sources())
+
+
+async def clients_json(request):
+    return web.json_response(hub.clients())
+
+
+@sio.event
+async def connect(sid, environ):
+    hub.connect(sid)
+    await send(sid)
+
+
+@sio.on("setBounds")
+async def set_bounds(sid, bounds):
+    hub.set_bounds(sid, bounds)
+    await send(sid)
+
+
+@sio.event
+async def disconnect(sid, *args):
+    hub.disconnect(sid)
+
+
+async def start_tasks(app):
+    app["zmq_context"] = zmq.asyncio.Context()
+    app["tasks"] = [asyncio.ensure_future(zmq_task(app["zmq_context"], source, address)) for (source, address) in server.ZMQ_SOURCES.items()]
+    app["tasks"].append(asyncio.ensure_future(broadcast_task()))
+
+
+async def stop_tasks(app):
+    # Graceful shutdown: stop receiving and broadcasting, disconnect the
+    # clients, then close the ZMQ sockets
+    for task in app["tasks"]:
+        task.cancel()
+    await asyncio.gather(*app["tasks"], return_exceptions=True)
+
+    for sid in list(hub.client_queues):
+        await sio.disconnect(sid)
+
+    app["zmq_context"].term()
+
+
+app.router.add_get("/", index)
+app.router.add_get("/aircraft.json", aircraft_json)
+app.router.add_get("/sources.json", sources_json)
+app.router.add_get("/clients.json", clients_json)
+app.router.add_static("/", server.STATIC_DIR)
+app.on_startup.append(start_tasks)
+app.on_shutdown.append(stop_tasks)
+
+
+if __name__ == "__main__":
+    web.run_app(app, host=server.HTTP_ADDRESS, port=server.HTTP_PORT)